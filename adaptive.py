@@ -0,0 +1,169 @@
+"""Перехват с адаптивным шагом физики (удвоение шага с оценкой ошибки).
+
+Каждый шаг h делается дважды: одним шагом h и двумя шагами h/2 от того же состояния.
+Разность положений тел - оценка локальной ошибки. Если она больше tol, шаг отклоняется
+и повторяется с меньшим h, иначе принимается результат двух полушагов, а следующий h
+подбирается по ошибке. Пока линия визирования почти не вращается, шаги растут до h_max,
+у точки перехвата, где ракета резко маневрирует, дробятся. Шаг не переступает моменты
+переключения управления самолетом, поэтому кусочно-постоянные маневры цели не размываются.
+
+Пример:
+    python adaptive.py --law TPN --tol 1e-3
+"""
+
+import argparse
+from time import perf_counter
+from typing import NamedTuple
+
+import const
+import headless
+import laws
+from headless import Outcome, Timeline
+from simulation import Simulation
+
+# Схема шага Airplane.calc_move первого порядка: локальная ошибка ~ h**2
+ORDER = 1
+SAFETY = 0.9
+MIN_SCALE, MAX_SCALE = 0.2, 2.0
+
+
+class AdaptiveOutcome(NamedTuple):
+    """Итог перехвата с адаптивным шагом"""
+    outcome: Outcome        # итог, как у headless.run (steps - число принятых шагов)
+    rejected: int           # число отклоненных шагов
+    error: float            # оценка накопленной ошибки положения (сумма локальных оценок)
+    max_error: float        # наибольшая локальная оценка среди принятых шагов
+    min_step: float
+    max_step: float
+
+
+def _save(sim: Simulation):
+    return (dict(vars(sim.airplane)), dict(vars(sim.missile)),
+            sim.time, sim.game_over, sim.win, sim.event_time, sim.miss_distance)
+
+
+def _restore(sim: Simulation, state):
+    airplane, missile, sim.time, sim.game_over, sim.win, sim.event_time, sim.miss_distance = state
+    vars(sim.airplane).update(airplane)
+    vars(sim.missile).update(missile)
+
+
+def _step(sim: Simulation, h: float, controls):
+    if controls is not None:
+        sim.control(*controls(sim.time, sim))
+    sim.update(h)
+
+
+def run(
+    law=laws.TPN,
+    N=const.N,
+    controls: Timeline | list | None = None,
+    tol: float = 1e-3,
+    h_min: float = 1e-4,
+    h_max: float = 0.5,
+    t_max: float = 120.0,
+    airplane_start=None,
+    missile_start=None,
+) -> AdaptiveOutcome:
+    """Проводит один перехват без отрисовки с адаптивным шагом.
+
+    Args:
+        law: закон наведения из laws.py
+        N: навигационная постоянная
+        controls: сценарий управления самолетом - Timeline или список (t, turn, throttle), None - прямой полет
+        tol (float): допустимая локальная ошибка положения за шаг
+        h_min (float): наименьший шаг, меньший шаг принимается без проверки ошибки
+        h_max (float): наибольший шаг
+        t_max (float): предельное время симуляции
+        airplane_start: начальные условия самолета, по умолчанию const.airplane_start
+        missile_start: начальные условия ракеты, по умолчанию const.missile_start
+
+    Returns:
+        AdaptiveOutcome: итог и статистика шагов
+    """
+    if isinstance(controls, (list, tuple)):
+        controls = Timeline(controls)
+    switches = controls.times if controls is not None else []
+    sim = Simulation(law, N, airplane_start, missile_start, record_trajectory=False)
+    sim.running = True
+
+    h = h_min * 16
+    steps = rejected = 0
+    error = max_error = 0.0
+    min_step, max_step = float("inf"), 0.0
+    while not sim.game_over and sim.time < t_max - const.eps:
+        # не переступаем переключение управления и конец симуляции
+        limit = t_max - sim.time
+        for t in switches:
+            if t > sim.time + const.eps:
+                limit = min(limit, t - sim.time)
+                break
+        h = min(h, limit)
+
+        start = _save(sim)
+        _step(sim, h, controls)
+        big = (sim.airplane.x, sim.airplane.y, sim.missile.x, sim.missile.y, sim.game_over)
+        _restore(sim, start)
+        _step(sim, h / 2, controls)
+        if not sim.game_over:
+            _step(sim, h / 2, controls)
+        small = (sim.airplane.x, sim.airplane.y, sim.missile.x, sim.missile.y)
+
+        local = max(const.hypotenuse(big[0] - small[0], big[1] - small[1]),
+                    const.hypotenuse(big[2] - small[2], big[3] - small[3]))
+        # если поражение есть только в одном из вариантов, шаг слишком груб для точки перехвата
+        if big[4] != sim.game_over and h > h_min:
+            local = max(local, 2 * tol)
+
+        if local > tol and h > h_min:
+            _restore(sim, start)
+            rejected += 1
+            h = max(h_min, h * max(MIN_SCALE, SAFETY * (tol / local) ** (1 / (ORDER + 1))))
+            continue
+
+        steps += 1
+        error += local
+        max_error = max(max_error, local)
+        min_step, max_step = min(min_step, h), max(max_step, h)
+        scale = MAX_SCALE if local == 0 else SAFETY * (tol / local) ** (1 / (ORDER + 1))
+        h = min(h_max, h * min(MAX_SCALE, max(MIN_SCALE, scale)))
+
+    if sim.win:
+        result = "win"
+    elif sim.game_over:
+        result = "hit"
+    else:
+        result = "timeout"
+    outcome = Outcome(result, sim.event_time if sim.game_over else sim.time, sim.miss_distance, steps)
+    return AdaptiveOutcome(outcome, rejected, error, max_error, min_step, max_step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перехват с адаптивным шагом в сравнении с фиксированным")
+    parser.add_argument("--law", default="TPN", choices=[law.__name__ for law in Simulation().laws.values()])
+    parser.add_argument("--N", type=float, default=const.N)
+    parser.add_argument("--tol", type=float, default=1e-3)
+    parser.add_argument("--h-max", type=float, default=0.5)
+    parser.add_argument("--t-max", type=float, default=120.0)
+    parser.add_argument("--controls", nargs="*", default=[], metavar="'t turn throttle'",
+                        help="точки сценария управления самолетом")
+    args = parser.parse_args()
+
+    law = getattr(laws, args.law)
+    controls = [tuple(map(float, point.split())) for point in args.controls] or None
+
+    start_time = perf_counter()
+    adaptive = run(law, args.N, controls, args.tol, h_max=args.h_max, t_max=args.t_max)
+    adaptive_time = perf_counter() - start_time
+    start_time = perf_counter()
+    fixed = headless.run(law, args.N, controls, 1 / const.physics_rate, args.t_max)
+    fixed_time = perf_counter() - start_time
+
+    print(f"адаптивный: {adaptive.outcome}, отклонено {adaptive.rejected}, "
+          f"оценка ошибки {adaptive.error:.2e} (макс. за шаг {adaptive.max_error:.2e}), "
+          f"шаг {adaptive.min_step:.2e}..{adaptive.max_step:.2e} с, {adaptive_time:.3f} с")
+    print(f"фиксированный 1/{const.physics_rate}: {fixed}, {fixed_time:.3f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Подбор навигационной постоянной N и постоянной времени t_norm для каждого закона.
+
+Кандидаты (N, t_norm) разыгрываются логарифмически равномерно в заданных границах
+(t_norm - только у PP и APN, остальным законам он не нужен) и отсеиваются последовательным
+делением (successive halving): все кандидаты считаются на небольшом наборе сценариев,
+лучшая 1/eta часть проходит дальше и считается на наборе в eta раз больше, и так пока
+не останется один кандидат или не кончатся сценарии. Так на явно плохих кандидатов уходит
+мало перехватов. Текущие const.N и laws.t_norm всегда входят в число кандидатов.
+
+Сценарии - как в montecarlo.sample (разброс начальных условий и кусочно-постоянное уклонение),
+одни и те же для всех кандидатов. Кандидаты одного круга делятся на пакеты, каждый пакет -
+один headless.BatchSimulation на кандидаты x сценарии, пакеты считаются в ProcessPoolExecutor.
+
+Цена кандидата - средняя по сценариям сумма промаха (наименьшего расстояния, обрезанного
+сверху miss_cap) и effort_weight * усилия (среднего |an| ракеты за полет в долях предела).
+Перехваты считаются с шагом физики окна (1 / const.physics_rate), шаг пишется в presets.json,
+и simulation.load_presets не примет параметры, подобранные с другим шагом.
+
+Пример:
+    python autotune.py --laws PP APN --candidates 64 --out presets.json
+    python main.py --presets presets.json
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import NamedTuple
+
+import numpy as np
+
+import batch_laws
+import const
+import headless
+import laws as laws_module
+import montecarlo
+
+# Законы, которые используют t_norm
+USES_T_NORM = ("PP", "APN")
+
+
+class Tuning(NamedTuple):
+    """Границы поиска и вес усилия в цене"""
+    N_min: float = 1.0
+    N_max: float = 10.0
+    t_norm_min: float = 0.1
+    t_norm_max: float = 10.0
+    effort_weight: float = 1.0      # сколько единиц промаха стоит среднее усилие на пределе
+    miss_cap: float = 50.0          # промах больше этого считается одинаково плохим
+
+
+class Score(NamedTuple):
+    """Средние по сценариям показатели кандидатов, по элементу массива на кандидата"""
+    cost: np.ndarray
+    hit_rate: np.ndarray
+    miss: np.ndarray        # средний обрезанный промах
+    effort: np.ndarray      # среднее усилие в долях 2 * acceleration_n
+
+
+def scenarios(count: int, seed: int, scenario: montecarlo.Scenario = montecarlo.Scenario()):
+    """Набор сценариев: airplane_start (count, 5), missile_start (count, 5), Schedule"""
+    rng = np.random.default_rng(seed)
+    airplane_start, missile_start, _, schedule = montecarlo.sample(rng, count, scenario)
+    return airplane_start, missile_start, schedule
+
+
+def evaluate(law_code: int, N, t_norm, airplane_start, missile_start, schedule: headless.Schedule,
+             tuning: Tuning = Tuning(), dt: float = 1 / const.physics_rate, t_max: float = 60.0) -> Score:
+    """Считает всех кандидатов (N[i], t_norm[i]) на всех сценариях одним пакетом.
+
+    Args:
+        law_code (int): индекс закона в batch_laws.LAWS
+        N, t_norm: массивы (C,) параметров кандидатов
+        airplane_start, missile_start: массивы (S, 5) начальных условий сценариев
+        schedule (headless.Schedule): уклонение самолета в S сценариях
+        tuning (Tuning): вес усилия и обрезка промаха
+        dt (float): шаг физики, по умолчанию как в окне - с ним же применяются подобранные параметры
+        t_max (float): предельное время перехвата
+
+    Returns:
+        Score: показатели кандидатов
+    """
+    N, t_norm = np.asarray(N, dtype=np.float64), np.asarray(t_norm, dtype=np.float64)
+    candidates, count = len(N), len(airplane_start)
+    # строка = кандидат x сценарий, сценарии кандидата идут подряд
+    sim = headless.BatchSimulation(
+        law_code, np.repeat(N, count), np.tile(airplane_start, (candidates, 1)),
+        np.tile(missile_start, (candidates, 1)), t_norm=np.repeat(t_norm, count),
+    )
+    controls = headless.Schedule(schedule.times, np.tile(schedule.turn, (candidates, 1)),
+                                 np.tile(schedule.throttle, (candidates, 1)))
+    an = sim.store.an
+    effort = np.zeros(len(sim))
+    steps = np.zeros(len(sim))
+    while not sim.done.all() and sim.time < t_max:
+        sim.control(*controls(sim.time))
+        running = ~sim.done
+        sim.update(dt)
+        effort += np.where(running, np.abs(an[sim.missiles]), 0.0)
+        steps += running
+
+    effort = effort / np.maximum(steps, 1) / (2 * const.acceleration_n)
+    miss = np.minimum(sim.miss_distance, tuning.miss_cap)
+    hit = sim.result == headless.HIT
+    mean = lambda values: values.reshape(candidates, count).mean(axis=1)
+    return Score(mean(miss + tuning.effort_weight * effort), mean(hit.astype(np.float64)), mean(miss), mean(effort))
+
+
+def _evaluate_worker(law_code, N, t_norm, count, seed, scenario, tuning) -> Score:
+    """evaluate на наборе из count сценариев с зерном seed (набор разыгрывается прямо в процессе)"""
+    airplane_start, missile_start, schedule = scenarios(count, seed, scenario)
+    return evaluate(law_code, N, t_norm, airplane_start, missile_start, schedule, tuning, scenario.dt, scenario.t_max)
+
+
+def candidates(law, count: int, rng: np.random.Generator, tuning: Tuning = Tuning()):
+    """Случайные кандидаты (N, t_norm), первый - текущие const.N и laws.t_norm"""
+    N = np.exp(rng.uniform(np.log(tuning.N_min), np.log(tuning.N_max), count))
+    if law.__name__ in USES_T_NORM:
+        t_norm = np.exp(rng.uniform(np.log(tuning.t_norm_min), np.log(tuning.t_norm_max), count))
+    else:
+        t_norm = np.full(count, float(laws_module.t_norm))
+    N[0], t_norm[0] = const.N, laws_module.t_norm
+    return N, t_norm
+
+
+def tune(
+    law,
+    count: int = 64,
+    eta: int = 2,
+    min_scenarios: int = 32,
+    max_scenarios: int = 1024,
+    seed: int = 0,
+    tuning: Tuning = Tuning(),
+    scenario: montecarlo.Scenario = montecarlo.Scenario(),
+    pool: ProcessPoolExecutor | None = None,
+    workers: int | None = None,
+    progress=None,
+) -> dict:
+    """Подбирает N и t_norm закона последовательным делением.
+
+    Args:
+        law: закон из laws.py
+        count (int): число начальных кандидатов
+        eta (int): во сколько раз на каждом круге сокращаются кандидаты и растет число сценариев
+        min_scenarios (int): сценариев на первом круге
+        max_scenarios (int): наибольшее число сценариев
+        seed (int): зерно кандидатов и сценариев, результат детерминирован
+        tuning (Tuning): границы поиска и цена
+        scenario (montecarlo.Scenario): разброс сценариев, шаг физики и предельное время перехвата
+        pool (ProcessPoolExecutor | None): пул процессов, по умолчанию создается на workers процессов
+        workers (int | None): число процессов пула, по умолчанию os.cpu_count() (см. montecarlo.worker_count)
+        progress: функция progress(law_name, round, candidates, scenarios, best_cost) после каждого круга
+
+    Returns:
+        dict: лучшие N, t_norm и их показатели на последнем круге, для сравнения - показатели
+            const.N и laws.t_norm на тех же сценариях (если они лучше, они и выбираются)
+    """
+    workers = montecarlo.worker_count(workers)
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    code = batch_laws.SCALAR_LAWS.index(law)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(code,)))
+    N, t_norm = candidates(law, count, rng, tuning)
+    alive = np.arange(count)
+
+    def run(index, scenarios_count) -> Score:
+        # пакеты по кандидатам, чтобы загрузить все процессы
+        parts = np.array_split(index, min(workers, len(index)))
+        futures = [
+            pool.submit(_evaluate_worker, code, N[part], t_norm[part], scenarios_count, seed, scenario, tuning)
+            for part in parts
+        ]
+        scores = [f.result() for f in futures]
+        return Score(*(np.concatenate(values) for values in zip(*scores)))
+
+    try:
+        scenarios_count = min_scenarios
+        round_number = 0
+        while True:
+            score = run(alive, scenarios_count)
+            order = np.argsort(score.cost, kind="stable")
+            if progress is not None:
+                progress(law.__name__, round_number, len(alive), scenarios_count, float(score.cost[order[0]]))
+            if len(alive) == 1 or scenarios_count >= max_scenarios:
+                break
+            keep = max(1, len(alive) // eta)
+            alive = alive[order[:keep]]
+            scenarios_count = min(scenarios_count * eta, max_scenarios)
+            round_number += 1
+
+        # текущие параметры досчитываются на последнем наборе, даже если выбыли раньше:
+        # на малых наборах отсев шумный, и без этого подбор мог бы оказаться хуже исходного
+        default = run(np.array([0]), scenarios_count) if 0 not in alive else \
+            Score(*(values[alive == 0] for values in score))
+    finally:
+        if own_pool:
+            pool.shutdown(cancel_futures=True)
+
+    best = order[0]
+    if default.cost[0] <= score.cost[best]:
+        chosen, best_score = 0, Score(*(values[0] for values in default))
+    else:
+        chosen, best_score = alive[best], Score(*(values[best] for values in score))
+    return {
+        "N": float(N[chosen]),
+        "t_norm": float(t_norm[chosen]),
+        "cost": float(best_score.cost),
+        "hit_rate": float(best_score.hit_rate),
+        "miss": float(best_score.miss),
+        "effort": float(best_score.effort),
+        "scenarios": scenarios_count,
+        "dt": scenario.dt,
+        "default_cost": float(default.cost[0]),
+        "default_hit_rate": float(default.hit_rate[0]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подбор N и t_norm для каждого закона наведения")
+    parser.add_argument("--laws", nargs="*", default=[law.__name__ for law in batch_laws.SCALAR_LAWS])
+    parser.add_argument("--candidates", type=int, default=64)
+    parser.add_argument("--eta", type=int, default=2)
+    parser.add_argument("--min-scenarios", type=int, default=32)
+    parser.add_argument("--max-scenarios", type=int, default=1024)
+    parser.add_argument("--effort-weight", type=float, default=Tuning().effort_weight)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default=const.presets_file)
+    args = parser.parse_args()
+
+    def progress(name, round_number, count, scenarios_count, cost):
+        print(f"{name}: круг {round_number}, кандидатов {count}, сценариев {scenarios_count}, лучшая цена {cost:.3f}",
+              flush=True)
+
+    tuning = Tuning(effort_weight=args.effort_weight)
+    presets = {}
+    start_time = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for name in args.laws:
+            result = tune(getattr(laws_module, name), args.candidates, args.eta, args.min_scenarios,
+                          args.max_scenarios, args.seed, tuning, pool=pool, workers=args.workers,
+                          progress=progress)
+            presets[name] = result
+            print(f"{name}: N = {result['N']:.3f}, t_norm = {result['t_norm']:.3f}, "
+                  f"цена {result['cost']:.3f} (было {result['default_cost']:.3f}), "
+                  f"поражение {result['hit_rate']:.1%} (было {result['default_hit_rate']:.1%})", flush=True)
+
+    with open(args.out, "w") as f:
+        json.dump(presets, f, indent=2)
+    print(f"Сохранено в {args.out} за {perf_counter() - start_time:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
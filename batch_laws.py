@@ -0,0 +1,179 @@
+"""Векторизованные версии законов наведения из laws.py.
+
+Каждый закон принимает цель и ракету в виде объектов с массивами x, y, vx, vy, ax, ay
+(по одному элементу на пару цель-ракета) и возвращает массив боковых ускорений
+за один вызов. t_norm (постоянная времени PP и APN) - число или массив, по умолчанию laws.t_norm,
+остальные законы его не используют. Подходит любой объект с такими атрибутами: State, срез BodyArray и т.п.
+
+Точность: результаты совпадают со скалярными законами из laws.py с допуском
+rtol=1e-9, atol=1e-9 (разница только в последних битах atan2/sqrt).
+Единственное расхождение - вырожденный случай myZEM с нулевой скоростью ракеты:
+скалярная версия падает с ZeroDivisionError, векторная возвращает 0.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+import const
+import laws
+
+
+class State(NamedTuple):
+    """Состояние набора тел в виде массивов (по элементу на тело)"""
+    x: np.ndarray
+    y: np.ndarray
+    vx: np.ndarray
+    vy: np.ndarray
+    ax: np.ndarray
+    ay: np.ndarray
+
+    @classmethod
+    def stack(cls, objects) -> "State":
+        """Собирает State из списка объектов bodies.Airplane / bodies.Missile"""
+        data = np.array([(o.x, o.y, o.vx, o.vy, o.ax, o.ay) for o in objects], dtype=np.float64)
+        return cls(*data.reshape(-1, 6).T)
+
+
+class Geometry(NamedTuple):
+    """Относительная геометрия цель-ракета, общая для всех законов"""
+    x: np.ndarray       # разность координат x (цель - ракета)
+    y: np.ndarray       # разность координат y
+    vx: np.ndarray      # разность проекций скорости на OX
+    vy: np.ndarray      # разность проекций скорости на OY
+    r2: np.ndarray      # квадрат дальности
+    r: np.ndarray       # дальность
+    vp: np.ndarray      # модуль скорости ракеты
+    los_rate: np.ndarray  # угловая скорость линии визирования (nan при r = 0)
+
+
+def relative(target, pursuer) -> Geometry:
+    """Считает относительную геометрию для всех пар цель-ракета сразу.
+
+    Args:
+        target: цели (объект с массивами x, y, vx, vy)
+        pursuer: ракеты (объект с массивами x, y, vx, vy)
+
+    Returns:
+        Geometry: относительные величины
+    """
+    x = np.asarray(target.x, dtype=np.float64) - pursuer.x
+    y = np.asarray(target.y, dtype=np.float64) - pursuer.y
+    vx = np.asarray(target.vx, dtype=np.float64) - pursuer.vx
+    vy = np.asarray(target.vy, dtype=np.float64) - pursuer.vy
+    r2 = x * x + y * y
+    pvx = np.asarray(pursuer.vx, dtype=np.float64)
+    pvy = np.asarray(pursuer.vy, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        los_rate = (vy * x - vx * y) / r2
+    return Geometry(x, y, vx, vy, r2, np.sqrt(r2), np.sqrt(pvx * pvx + pvy * pvy), los_rate)
+
+
+def norm_a(vx: np.ndarray, vy: np.ndarray, a: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Векторный аналог laws.norm_a - раскладывает боковое ускорение на проекции"""
+    vp = np.sqrt(vx * vx + vy * vy)
+    moving = vp >= const.eps
+    vp = vp + const.eps
+    ax = np.where(moving, -a * (vy / vp), 0.0)
+    ay = np.where(moving, a * (vx / vp), 0.0)
+    return ax, ay
+
+
+def join_a(vx: np.ndarray, vy: np.ndarray, ax: np.ndarray, ay: np.ndarray) -> np.ndarray:
+    """Векторный аналог laws.join_a"""
+    return np.sqrt(ax * ax + ay * ay) * np.sign(vx * ay - vy * ax)
+
+
+def vc(dx: np.ndarray, dy: np.ndarray, dvx: np.ndarray, dvy: np.ndarray) -> np.ndarray:
+    """Векторный аналог laws.vc - скорость сближения, положительна при сближении"""
+    return np.sqrt(dvx * dvx + dvy * dvy) * np.sign(-dvx * dx - dvy * dy)
+
+
+def PP(target, pursuer, N, dt: float, geom: Geometry | None = None, t_norm=None) -> np.ndarray:
+    """Векторный laws.PP (Pure Pursuit)"""
+    g = relative(target, pursuer) if geom is None else geom
+    target_angle = np.arctan2(g.y, g.x)
+    velocity_angle = np.arctan2(pursuer.vy, pursuer.vx)
+    angle_diff = np.mod(target_angle - velocity_angle + np.pi, 2 * np.pi) - np.pi
+    a = N * (angle_diff * g.vp) / (laws.t_norm if t_norm is None else t_norm)
+    return np.where(g.r < const.eps, 0.0, a)
+
+
+def TPN(target, pursuer, N, dt: float, geom: Geometry | None = None, t_norm=None) -> np.ndarray:
+    """Векторный laws.TPN (True Proportional Navigation)"""
+    g = relative(target, pursuer) if geom is None else geom
+    a = g.los_rate * g.vp * N
+    return np.where(g.r <= const.eps, 0.0, a)
+
+
+def APN(target, pursuer, N, dt: float, geom: Geometry | None = None, t_norm=None) -> np.ndarray:
+    """Векторный laws.APN (Augmented Proportional Navigation)"""
+    g = relative(target, pursuer) if geom is None else geom
+    ax = np.asarray(target.ax, dtype=np.float64) - pursuer.ax
+    ay = np.asarray(target.ay, dtype=np.float64) - pursuer.ay
+
+    numerator = g.vy * g.x - g.vx * g.y
+    denominator = g.r2 + const.eps
+    d_numerator = ay * g.x - ax * g.y
+    d_denominator = 2 * (g.x * g.vx + g.y * g.vy)
+    alpha_los = (d_numerator * denominator - numerator * d_denominator) / (denominator ** 2)
+
+    t_norm = laws.t_norm if t_norm is None else t_norm
+    a = (g.los_rate + 0.5 * alpha_los * t_norm) * g.vp * N
+    return np.where(g.r <= const.eps, 0.0, a)
+
+
+def _zem(g: Geometry, pursuer, N, ax, ay) -> np.ndarray:
+    """Общая часть ZEMPN и ZEMAPN: промах с учетом ускорения цели ax, ay (0 для ZEMPN)"""
+    numerator = g.x * g.vx + g.y * g.vy
+    denominator = g.vx**2 + g.vy**2 + const.eps
+    tgo = -numerator / denominator
+
+    ZEMx = g.x + g.vx * tgo + 0.5 * ax * tgo**2
+    ZEMy = g.y + g.vy * tgo + 0.5 * ay * tgo**2
+
+    # Нормаль к скорости ракеты, ее длина равна скорости ракеты
+    valid = (g.r >= const.eps) & (g.vp >= const.eps)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ZEM_proj = (ZEMx * -np.asarray(pursuer.vy) + ZEMy * pursuer.vx) / g.vp
+    a = (N * ZEM_proj) / (tgo**2 + const.eps)
+    return np.where(valid, a, 0.0)
+
+
+def ZEMPN(target, pursuer, N, dt: float, geom: Geometry | None = None, t_norm=None) -> np.ndarray:
+    """Векторный laws.ZEMPN (Zero Effort Miss Proportional Navigation)"""
+    g = relative(target, pursuer) if geom is None else geom
+    return _zem(g, pursuer, N, 0.0, 0.0)
+
+
+def ZEMAPN(target, pursuer, N, dt: float, geom: Geometry | None = None, t_norm=None) -> np.ndarray:
+    """Векторный laws.ZEMAPN (Zero Effort Miss Augmented Proportional Navigation)"""
+    g = relative(target, pursuer) if geom is None else geom
+    return _zem(g, pursuer, N, np.asarray(target.ax, dtype=np.float64), np.asarray(target.ay, dtype=np.float64))
+
+
+def myZEM(target, pursuer, N, dt: float, geom: Geometry | None = None, t_norm=None) -> np.ndarray:
+    """Векторный laws.myZEM. Там, где скалярный закон переходит на TPN, используется векторный TPN"""
+    g = relative(target, pursuer) if geom is None else geom
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost = pursuer.vy / g.vp
+        sint = -np.asarray(pursuer.vx) / g.vp
+        # переход в систему отсчета ракеты
+        xt = g.x * cost + g.y * sint
+        yt = -g.x * sint + g.y * cost
+        vxt = target.vx * cost + target.vy * sint
+        vyt = -target.vx * sint + target.vy * cost
+
+        tgo_raw = -xt / vxt
+        tgo = np.clip(tgo_raw, const.eps, 999999)
+        ZEM = yt + vyt * tgo - g.vp * tgo
+        a = N * ZEM * np.sign(xt) * np.sign(tgo_raw) / (tgo**2 + const.eps)
+
+    a = np.where(np.abs(vxt) < const.eps, TPN(target, pursuer, N, dt, g), a)
+    return np.where(g.vp == 0.0, 0.0, a)
+
+
+# Соответствие скалярных законов векторным, порядок как в Simulation.laws
+SCALAR_LAWS = (laws.PP, laws.TPN, laws.APN, laws.ZEMPN, laws.ZEMAPN, laws.myZEM)
+LAWS = (PP, TPN, APN, ZEMPN, ZEMAPN, myZEM)
+BATCHED = dict(zip(SCALAR_LAWS, LAWS))
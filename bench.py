@@ -0,0 +1,266 @@
+"""Замеры скорости горячих мест физики, наведения и генерации карты.
+
+Каждый замер - функция run(n), делающая n вызовов замеряемого кода и возвращающая объем
+сделанной работы (вызовов законов, шагов физики, точек карты). Число вызовов подбирается
+так, чтобы один прогон длился не меньше --min-time, из --repeat прогонов берется лучший.
+Начальные условия фиксированы. Шаги физики считаются отрезками по SEGMENT шагов, каждый
+от свежей копии одного и того же состояния, поэтому нагрузка не зависит от числа вызовов
+и не уплывает (ракета не долетает до цели, скорости не упираются в пределы).
+Сборщик мусора на время прогона отключается. Пик памяти
+меряется отдельным прогоном под tracemalloc (у генерации карты - только главного процесса).
+
+Результаты пишутся в JSON. С --baseline замеры сравниваются с сохраненными ранее, и те,
+что стали медленнее больше чем на --threshold, отмечаются как регрессии (код выхода 1).
+
+Пример:
+    python bench.py --out bench_baseline.json               # сохранить базовые замеры
+    python bench.py --baseline bench_baseline.json          # сравнить с ними
+    python bench.py --filter law. --baseline bench_baseline.json
+"""
+
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+import const
+import headless
+import laws
+from simulation import ComparisonSimulation, Simulation
+
+# Сценарий уклонения самолета для замера целого перехвата
+MANEUVER = [(0.0, 1.0, 0.0), (3.0, -1.0, 1.0), (6.0, 0.0, 0.0)]
+# Сколько секунд перехвата пропустить, чтобы законы считались в типичной геометрии, а не на старте
+WARMUP_TIME = 2.0
+# Длина отрезка шагов физики от одного состояния (~1 с полета, до попадания еще далеко)
+SEGMENT = 256
+
+
+class Case(NamedTuple):
+    """Замер: make() готовит состояние и возвращает run(n) -> объем работы"""
+    name: str
+    unit: str       # единица работы для скорости: "calls", "steps", "pixels"
+    make: Callable[[], Callable[[int], int]]
+
+
+class Result(NamedTuple):
+    ns_per_call: float  # время одного вызова run, нс
+    rate: float         # работы в секунду
+    unit: str
+    peak_kib: float     # пик выделенной памяти за прогон, КиБ
+    calls: int          # вызовов в одном прогоне
+
+
+def _engagement(law=laws.TPN, compare: bool = False) -> Simulation:
+    """Перехват после WARMUP_TIME секунд полета с маневром"""
+    sim = ComparisonSimulation(record_trajectory=False) if compare else Simulation(law, record_trajectory=False)
+    sim.running = True
+    controls = headless.Timeline(MANEUVER)
+    while sim.time < WARMUP_TIME:
+        sim.control(*controls(sim.time))
+        sim.update(sim.physics_dt)
+    return sim
+
+
+def _segments(state, n: int):
+    """Делит n шагов на отрезки по SEGMENT, для каждого - свежая копия state: (копия, число шагов)"""
+    for start in range(0, n, SEGMENT):
+        yield copy.deepcopy(state), min(SEGMENT, n - start)
+
+
+def law_case(law) -> Case:
+    def make():
+        sim = _engagement(law)
+        target, pursuer, N, dt = sim.airplane, sim.missile, sim.N, sim.physics_dt
+
+        def run(n):
+            for _ in range(n):
+                law(target, pursuer, N, dt)
+            return n
+        return run
+    return Case(f"law.{law.__name__}", "calls", make)
+
+
+def calc_move_case(kind: str) -> Case:
+    def make():
+        sim = _engagement()
+        start = sim.airplane if kind == "Airplane" else sim.missile
+        dt = sim.physics_dt
+
+        def run(n):
+            for body, steps in _segments(start, n):
+                for _ in range(steps):
+                    body.calc_move(dt)
+            return n
+        return run
+    return Case(f"{kind}.calc_move", "steps", make)
+
+
+def update_case(compare: bool = False) -> Case:
+    def make():
+        start = _engagement(compare=compare)
+        dt = start.physics_dt
+
+        def run(n):
+            for sim, steps in _segments(start, n):
+                for _ in range(steps):
+                    sim.update(dt)
+            return n
+        return run
+    return Case(f"{'ComparisonSimulation' if compare else 'Simulation'}.update", "steps", make)
+
+
+def headless_case(law=laws.TPN) -> Case:
+    def make():
+        def run(n):
+            steps = 0
+            for _ in range(n):
+                steps += headless.run(law, const.N, MANEUVER, 1 / const.physics_rate).steps
+            return steps
+        return run
+    return Case(f"headless.run.{law.__name__}", "steps", make)
+
+
+def noise_case(size: int, pool) -> Case:
+    def make():
+        # генерация карты импортируется, только если ее замеряют
+        import parallel_generation
+
+        def run(n):
+            for _ in range(n):
+                grid = parallel_generation.vectorized_noise(size, size, 1000.0, 6, 0.5, 2.0, 42, pool=pool)
+                grid.close()
+            return n * size * size
+        return run
+    return Case(f"vectorized_noise.{size}", "pixels", make)
+
+
+def cases(noise_sizes, pool) -> list[Case]:
+    result = [law_case(law) for law in Simulation().laws.values()]
+    result += [calc_move_case("Airplane"), calc_move_case("Missile"), update_case(), update_case(compare=True),
+               headless_case()]
+    result += [noise_case(size, pool) for size in noise_sizes]
+    return result
+
+
+def measure(case: Case, min_time: float = 0.2, repeat: int = 5) -> Result:
+    """Замеряет case: подбирает число вызовов, берет лучший из repeat прогонов и пик памяти"""
+    run = case.make()
+    run(1)  # прогрев: импорты, кэши, первый запуск пула
+
+    calls = 1
+    while True:
+        start_time = perf_counter()
+        run(calls)
+        if perf_counter() - start_time >= min_time or calls >= 10 ** 7:
+            break
+        calls *= 4
+
+    best, work = float("inf"), 0
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start_time = perf_counter()
+            done = run(calls)
+            elapsed = perf_counter() - start_time
+            if elapsed < best:
+                best, work = elapsed, done
+    finally:
+        if enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        run(1)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(best / calls * 1e9, work / best, case.unit, peak / 1024, calls)
+
+
+def environment() -> dict:
+    """Сведения о среде замера, чтобы сравнивать только сопоставимые результаты"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list[tuple[str, float, float]]:
+    """Замеры, ставшие медленнее базовых больше чем в 1 + threshold раз: (имя, было нс, стало нс)"""
+    found = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is not None and result["ns_per_call"] > old["ns_per_call"] * (1 + threshold):
+            found.append((name, old["ns_per_call"], result["ns_per_call"]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры скорости физики, законов наведения и генерации карты")
+    parser.add_argument("--filter", nargs="*", default=[], help="замерять только имена, содержащие одну из строк")
+    parser.add_argument("--noise-sizes", type=int, nargs="*", default=[256, 1024, 2048])
+    parser.add_argument("--min-time", type=float, default=0.2, help="наименьшая длительность одного прогона, с")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=None, help="файл JSON для результатов")
+    parser.add_argument("--baseline", default=None, help="файл JSON с базовыми результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.1, help="допустимое замедление, доля")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        current = environment()
+        for key in ("python", "numpy", "processor", "cpu_count"):
+            if saved["environment"].get(key) != current[key]:
+                print(f"Внимание: базовые замеры сделаны в другой среде ({key}: "
+                      f"{saved['environment'].get(key)} -> {current[key]})")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        for case in cases(args.noise_sizes, pool):
+            if args.filter and not any(part in case.name for part in args.filter):
+                continue
+            result = measure(case, args.min_time, args.repeat)
+            results[case.name] = result._asdict()
+            line = (f"{case.name:28} {result.ns_per_call:14.0f} нс/вызов {result.rate:14.4g} {result.unit}/с "
+                    f"{result.peak_kib:10.1f} КиБ")
+            if case.name in baseline:
+                line += f"  {result.ns_per_call / baseline[case.name]['ns_per_call'] - 1:+7.1%}"
+            print(line, flush=True)
+
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    found = regressions(results, baseline, args.threshold)
+    for name, old, new in found:
+        print(f"РЕГРЕССИЯ {name}: {old:.0f} -> {new:.0f} нс/вызов ({new / old - 1:+.1%})")
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
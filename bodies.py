@@ -1,5 +1,7 @@
 from numpy import clip
+import numpy as np
 
+import batch_laws
 import const
 import laws
 
@@ -55,11 +57,12 @@ class Airplane:
 
 
 class Missile(Airplane):
-    def __init__(self, x, y, vx, vy, air_drag, law, target, N):
+    def __init__(self, x, y, vx, vy, air_drag, law, target, N, t_norm=None):
         super().__init__(x, y, vx, vy, air_drag)
         self.law = law  # закон наведения на цель
         self.target = target  # сама цель
         self.N = N  # коэффициент пропорциональности наведения
+        self.t_norm = laws.t_norm if t_norm is None else t_norm  # постоянная времени PP и APN
         self.max_speed = self.current_speed
         
     def calc_move(self, dt):
@@ -70,3 +73,234 @@ class Missile(Airplane):
             2 * const.acceleration_n,
         )
         super().calc_move(dt)
+
+
+class BodyArray:
+    """Хранилище состояния множества самолетов и ракет в непрерывных массивах float64.
+
+    Каждое поле (x, y, vx, vy, ...) - строка одного двумерного массива, поэтому шаг
+    физики для всей популяции считается несколькими векторными операциями.
+    Отдельное тело можно получить через view(i) - это обычный Airplane / Missile,
+    который читает и пишет свое состояние прямо в массивы хранилища.
+    """
+    FIELDS = ("x", "y", "vx", "vy", "ax", "ay", "an", "at", "current_speed", "max_speed", "air_drag", "N", "t_norm")
+
+    def __init__(self, capacity: int = 16):
+        self.n = 0
+        self._data = np.zeros((len(self.FIELDS), capacity))
+        self.law = np.full(capacity, -1, dtype=np.int8)        # индекс закона в batch_laws.LAWS, -1 у самолетов
+        self.target = np.full(capacity, -1, dtype=np.intp)     # индекс цели ракеты
+        self.active = np.zeros(capacity, dtype=bool)           # неактивные тела не двигаются
+
+    def __len__(self):
+        return self.n
+
+    def _reserve(self, size: int):
+        capacity = self._data.shape[1]
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        data = np.zeros((len(self.FIELDS), capacity))
+        data[:, :self.n] = self._data[:, :self.n]
+        self._data = data
+        for name, fill in (("law", -1), ("target", -1), ("active", False)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def add_airplane(self, x, y, vx, vy, air_drag) -> int:
+        """Добавляет самолет, аргументы как у Airplane. Возвращает индекс тела"""
+        return int(self.add_airplanes([[x, y, vx, vy, air_drag]])[0])
+
+    def add_missile(self, x, y, vx, vy, air_drag, law, target: int, N, t_norm=None) -> int:
+        """Добавляет ракету, аргументы как у Missile, но target - индекс цели в хранилище"""
+        return int(self.add_missiles([[x, y, vx, vy, air_drag]], law, target, N, t_norm)[0])
+
+    def add_airplanes(self, starts) -> np.ndarray:
+        """Добавляет сразу несколько самолетов.
+
+        Args:
+            starts: массив (M, 5) начальных условий x, y, vx, vy, air_drag (как const.airplane_start)
+
+        Returns:
+            np.ndarray: индексы добавленных тел
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 5)
+        index = np.arange(self.n, self.n + len(starts))
+        self._reserve(self.n + len(starts))
+        self.n += len(starts)
+        data = self._data
+        data[:, index] = 0.0
+        data[:4, index] = starts[:, :4].T
+        data[self.FIELDS.index("air_drag"), index] = starts[:, 4]
+        data[self.FIELDS.index("current_speed"), index] = np.sqrt(starts[:, 2]**2 + starts[:, 3]**2)
+        data[self.FIELDS.index("max_speed"), index] = const.airplane_max_speed
+        self.law[index] = -1
+        self.target[index] = -1
+        self.active[index] = True
+        return index
+
+    def add_missiles(self, starts, law, target, N, t_norm=None) -> np.ndarray:
+        """Добавляет сразу несколько ракет.
+
+        Args:
+            starts: массив (M, 5) начальных условий x, y, vx, vy, air_drag (как const.missile_start)
+            law: закон наведения (скалярный или векторный) или массив индексов законов в batch_laws.LAWS
+            target: индекс цели или массив индексов целей
+            N: навигационная постоянная или массив постоянных
+            t_norm: постоянная времени PP и APN или массив, по умолчанию laws.t_norm
+
+        Returns:
+            np.ndarray: индексы добавленных тел
+        """
+        index = self.add_airplanes(starts)
+        data = self._data
+        data[self.FIELDS.index("max_speed"), index] = data[self.FIELDS.index("current_speed"), index]
+        data[self.FIELDS.index("N"), index] = N
+        data[self.FIELDS.index("t_norm"), index] = laws.t_norm if t_norm is None else t_norm
+        self.law[index] = law_index(law) if callable(law) else law
+        self.target[index] = target
+        return index
+
+    def view(self, i: int) -> "Airplane":
+        """Объект Airplane / Missile, хранящий состояние в строке i хранилища"""
+        return MissileView(self, i) if self.law[i] >= 0 else AirplaneView(self, i)
+
+    def select(self, index) -> "batch_laws.State":
+        """Состояние выбранных тел для векторных законов наведения"""
+        return batch_laws.State(*self._data[:6, index])
+
+    def calc_move(self, dt):
+        """Шаг физики для всех активных тел: сначала самолеты, затем ракеты (как в Simulation.update)"""
+        n = self.n
+        active = self.active[:n]
+        is_missile = self.law[:n] >= 0
+        self._move(np.flatnonzero(active & ~is_missile), dt)
+
+        missiles = np.flatnonzero(active & is_missile)
+        if missiles.size == 0:
+            return
+        pursuer = self.select(missiles)
+        target = self.select(self.target[missiles])
+        geom = batch_laws.relative(target, pursuer)
+        codes = self.law[missiles]
+        N = self._data[self.FIELDS.index("N"), missiles]
+        t_norm = self._data[self.FIELDS.index("t_norm"), missiles]
+        an = np.empty(missiles.size)
+        for code in np.unique(codes):
+            m = codes == code
+            if m.all():
+                an = batch_laws.LAWS[code](target, pursuer, N, dt, geom, t_norm)
+                break
+            an[m] = batch_laws.LAWS[code](_subset(target, m), _subset(pursuer, m), N[m], dt, _subset(geom, m),
+                                          t_norm[m])
+        self._data[self.FIELDS.index("an"), missiles] = np.clip(
+            an, -2 * const.acceleration_n, 2 * const.acceleration_n
+        )
+        self._move(missiles, dt)
+
+    def _move(self, index, dt):
+        """Векторный аналог Airplane.calc_move для тел с индексами index"""
+        if index.size == 0:
+            return
+        x, y, vx, vy, _, _, an, at, speed, max_speed, air_drag = self._data[:11, index]
+
+        ax, ay = batch_laws.norm_a(vx, vy, an)
+        speed = speed + at * dt - np.sqrt(ax * ax + ay * ay) * dt * air_drag
+
+        # остановившиеся тела только запоминают ускорение и обнуляют скорость
+        moving = speed >= const.eps
+        speed = np.where(moving, np.clip(speed, 1, max_speed), 0.0)
+
+        new_vx = vx + ax * dt
+        new_vy = vy + ay * dt
+        speed_after_turn = np.sqrt(new_vx * new_vx + new_vy * new_vy)
+        moving &= speed_after_turn > 0.0
+        scale = speed / np.where(moving, speed_after_turn, 1.0)
+        new_vx *= scale
+        new_vy *= scale
+
+        # "реальное" ускорение (для методов наведения с учетом ускорения цели)
+        ax = np.where(moving, (new_vx - vx) / dt, ax)
+        ay = np.where(moving, (new_vy - vy) / dt, ay)
+
+        # перемещение как средняя скорость * dt
+        x = np.where(moving, x + (vx + new_vx) / 2 * dt, x)
+        y = np.where(moving, y + (vy + new_vy) / 2 * dt, y)
+
+        data = self._data
+        data[0, index] = x
+        data[1, index] = y
+        data[2, index] = np.where(moving, new_vx, vx)
+        data[3, index] = np.where(moving, new_vy, vy)
+        data[4, index] = ax
+        data[5, index] = ay
+        data[8, index] = speed
+
+
+def _subset(arrays, mask):
+    """Выборка из State / Geometry по маске"""
+    return type(arrays)(*(a[mask] for a in arrays))
+
+
+def _store_field(k: int):
+    return property(
+        lambda self: self._data[k, :self.n],
+        lambda self, value: self._data[k, :self.n].__setitem__(slice(None), value),
+    )
+
+
+for _k, _name in enumerate(BodyArray.FIELDS):
+    setattr(BodyArray, _name, _store_field(_k))
+
+
+def law_index(law) -> int:
+    """Индекс закона в batch_laws.LAWS по скалярному или векторному закону"""
+    if law in batch_laws.LAWS:
+        return batch_laws.LAWS.index(law)
+    return batch_laws.SCALAR_LAWS.index(law)
+
+
+def _view_field(k: int):
+    return property(
+        lambda self: float(self._store._data[k, self._index]),
+        lambda self, value: self._store._data.__setitem__((k, self._index), value),
+    )
+
+
+class AirplaneView(Airplane):
+    """Самолет, состояние которого хранится в BodyArray"""
+    def __init__(self, store: BodyArray, index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+
+class MissileView(Missile, AirplaneView):
+    """Ракета, состояние которой хранится в BodyArray"""
+    def __init__(self, store: BodyArray, index: int):
+        AirplaneView.__init__(self, store, index)
+
+    @property
+    def law(self):
+        return batch_laws.SCALAR_LAWS[self._store.law[self._index]]
+
+    @law.setter
+    def law(self, law):
+        self._store.law[self._index] = law_index(law)
+
+    @property
+    def target(self):
+        return self._store.view(self._store.target[self._index])
+
+    @target.setter
+    def target(self, target: AirplaneView):
+        self._store.target[self._index] = target.index
+
+
+for _k, _name in enumerate(BodyArray.FIELDS):
+    setattr(AirplaneView, _name, _view_field(_k))
@@ -1,5 +1,9 @@
+rem tiles\ exists only after generator.py; without it main.py falls back to land.png
+set TILES=
+if exist tiles\meta.json set TILES=--add-data "tiles;tiles"
 python -m PyInstaller --onefile ^
     --add-data "land.png;." ^
+    %TILES% ^
     --add-data "aircraft.png;." ^
     --add-data "missile.png;." ^
     --add-data "boom.png;." ^
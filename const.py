@@ -5,12 +5,22 @@ N = 3   #навигационная постоянная ракеты
 plane_drag = True   #замедляется ли самолет
 acceleration_n = 100    #предельное боковое ускорение самолета
 acceleration_t = 10     #предельное продольное ускорение самолета
-FPS = 60               #частота обновления физики
+FPS = 60               #частота отрисовки (и записи траекторий)
+physics_rate = 240      #частота шагов физики, не зависит от FPS
+max_substeps = 32       #предел шагов физики за кадр, чтобы после подвисания не копить отставание
 update_text_fps = 10    #частота обновления текста
+land_tile_cache = 64    #сколько тайлов карты держать в памяти видеокарты
 scale = 7               #начальный масштаб симуляции
 move_trajectory = 1     #сдвиг начала траектории самолета
+trajectory_length = 600     #число точек траектории (пишутся с частотой FPS)
+trajectory_decimation = 1   #сохранять каждую n-ю точку траектории, для длинных траекторий
 win_zone_r = 5          #радиус области победы
-plane_size = 2          #размер самолета (для поражения ракетой), при низком размере и fps ракета может проходить самолет насквозь
+replay_seek = 5          #перемотка записи стрелками, секунды
+profile_window = 600     #число последних кадров для перцентилей профилировщика ([P])
+startup_budget = 1.5     #допустимое время от запуска до первого кадра, секунды (main.py --startup-check)
+display_cache = "display.json"   #файл с масштабом интерфейса по размеру экрана, чтобы не спрашивать tkinter при каждом запуске
+presets_file = "presets.json"   #подобранные autotune.py N и t_norm для каждого закона (main.py --presets)
+plane_size = 2          #размер самолета (для поражения ракетой), столкновение ищется по всему шагу (collision.py)
 
 #НАЧАЛЬНЫЕ УСЛОВИЯ: x, y, vx, vy
 airplane_start = [500.0, 500.0, -50.0, 0.0, air_drag if plane_drag else 0.0]
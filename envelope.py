@@ -0,0 +1,193 @@
+"""Карта зоны возможных пусков: перебор сетки начальных условий для каждого закона.
+
+По двум осям перебираются параметры начальных условий (например, положение пуска ракеты
+или курс цели), для каждой клетки сетки проводится перехват. Вся сетка считается
+векторно (headless.BatchSimulation) кусками в ProcessPoolExecutor.
+Результат - растры итога перехвата, времени перехвата и промаха в сжатом .npz
+и картинки PNG по каждому закону.
+
+Пример:
+    python envelope.py --x missile_x -1500 1500 300 --y missile_y -1500 1500 300 --laws TPN PP
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import atan2
+from time import perf_counter
+
+import numpy as np
+
+import batch_laws
+import const
+import headless
+import laws
+
+# Параметры, которые можно перебирать по осям карты
+PARAMETERS = ("missile_x", "missile_y", "missile_speed", "airplane_x", "airplane_y", "airplane_heading", "airplane_speed")
+
+
+def grid_starts(x_param: str, xs: np.ndarray, y_param: str, ys: np.ndarray):
+    """Начальные условия для всех клеток сетки (строки - ys, столбцы - xs).
+
+    Не перебираемые параметры берутся из const.airplane_start / const.missile_start.
+    Ракета всегда стартует носом на начальное положение самолета.
+
+    Returns:
+        tuple: airplane_start (ny * nx, 5), missile_start (ny * nx, 5)
+    """
+    X, Y = np.meshgrid(np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+    values = {x_param: X.ravel(), y_param: Y.ravel()}
+    size = X.size
+
+    ax, ay, avx, avy, a_drag = const.airplane_start
+    mx, my, mvx, mvy, m_drag = const.missile_start
+    airplane_speed = values.get("airplane_speed", const.hypotenuse(avx, avy))
+    airplane_heading = np.radians(values.get("airplane_heading", np.degrees(atan2(avy, avx))))
+    airplane_start = np.empty((size, 5))
+    airplane_start[:, 0] = values.get("airplane_x", ax)
+    airplane_start[:, 1] = values.get("airplane_y", ay)
+    airplane_start[:, 2] = airplane_speed * np.cos(airplane_heading)
+    airplane_start[:, 3] = airplane_speed * np.sin(airplane_heading)
+    airplane_start[:, 4] = a_drag
+
+    missile_start = np.empty((size, 5))
+    missile_start[:, 0] = values.get("missile_x", mx)
+    missile_start[:, 1] = values.get("missile_y", my)
+    missile_speed = values.get("missile_speed", const.hypotenuse(mvx, mvy))
+    boresight = np.arctan2(airplane_start[:, 1] - missile_start[:, 1], airplane_start[:, 0] - missile_start[:, 0])
+    missile_start[:, 2] = missile_speed * np.cos(boresight)
+    missile_start[:, 3] = missile_speed * np.sin(boresight)
+    missile_start[:, 4] = m_drag
+    return airplane_start, missile_start
+
+
+def _cells_worker(law_code: int, N: float, airplane_start, missile_start, turn: float, dt: float, t_max: float):
+    """Считает кусок сетки одним пакетом"""
+    sim = headless.BatchSimulation(law_code, N, airplane_start, missile_start)
+    controls = None
+    if turn:
+        controls = headless.Schedule([0.0], np.full((len(sim), 1), turn))
+    outcome = sim.run(controls, dt, t_max)
+    return outcome.result, outcome.time.astype(np.float32), outcome.miss_distance.astype(np.float32)
+
+
+def sweep(
+    x_param: str, xs, y_param: str, ys,
+    laws=batch_laws.SCALAR_LAWS,
+    N: float = const.N,
+    turn: float = 0.0,
+    dt: float = 1 / const.physics_rate,
+    t_max: float = 60.0,
+    chunk: int = 4096,
+    pool: ProcessPoolExecutor | None = None,
+) -> dict[str, np.ndarray]:
+    """Строит карты перехвата по сетке начальных условий.
+
+    Args:
+        x_param (str): параметр по горизонтальной оси, один из PARAMETERS
+        xs: значения параметра по горизонтали
+        y_param (str): параметр по вертикальной оси
+        ys: значения параметра по вертикали
+        laws: законы наведения из laws.py
+        N (float): навигационная постоянная
+        turn (float): постоянное управление самолетом turn (0 - прямой полет)
+        dt (float): шаг физики, по умолчанию как в окне (1 / const.physics_rate)
+        t_max (float): предельное время перехвата
+        chunk (int): число клеток в одном пакете
+        pool (ProcessPoolExecutor | None): пул процессов, по умолчанию на os.cpu_count() процессов
+
+    Returns:
+        dict[str, np.ndarray]: массивы xs, ys и для каждого закона <law>_result (коды headless),
+            <law>_time и <law>_miss формы (len(ys), len(xs))
+    """
+    for param in (x_param, y_param):
+        if param not in PARAMETERS:
+            raise ValueError(f"Неизвестный параметр '{param}', доступны: {', '.join(PARAMETERS)}")
+    xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    airplane_start, missile_start = grid_starts(x_param, xs, y_param, ys)
+    shape = (len(ys), len(xs))
+    size = airplane_start.shape[0]
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    maps = {"xs": xs, "ys": ys}
+    try:
+        futures = {}
+        for law in laws:
+            code = batch_laws.SCALAR_LAWS.index(law)
+            maps[f"{law.__name__}_result"] = np.empty(size, dtype=np.int8)
+            maps[f"{law.__name__}_time"] = np.empty(size, dtype=np.float32)
+            maps[f"{law.__name__}_miss"] = np.empty(size, dtype=np.float32)
+            for start in range(0, size, chunk):
+                cells = slice(start, min(start + chunk, size))
+                f = pool.submit(_cells_worker, code, N, airplane_start[cells], missile_start[cells], turn, dt, t_max)
+                futures[f] = (law.__name__, cells)
+        for f in as_completed(futures):
+            name, cells = futures[f]
+            maps[f"{name}_result"][cells], maps[f"{name}_time"][cells], maps[f"{name}_miss"][cells] = f.result()
+    finally:
+        if own_pool:
+            pool.shutdown(cancel_futures=True)
+
+    for key in maps:
+        if key not in ("xs", "ys"):
+            maps[key] = maps[key].reshape(shape)
+    return maps
+
+
+def to_image(result: np.ndarray, time: np.ndarray):
+    """Картинка карты: промах - черный, перехват - от желтого (быстро) до красного (долго), победа - зеленый"""
+    from PIL import Image
+
+    hit = result == headless.HIT
+    rgb = np.zeros((*result.shape, 3), dtype=np.uint8)
+    if hit.any():
+        t = time[hit]
+        k = (t - t.min()) / max(float(t.max() - t.min()), const.eps)
+        rgb[hit] = np.stack([np.full_like(k, 255), 230 * (1 - k), np.zeros_like(k)], axis=-1).astype(np.uint8)
+    rgb[result == headless.WIN] = (0, 160, 0)
+    # строка 0 - минимальное значение по y, в картинке она должна быть внизу
+    return Image.fromarray(rgb[::-1])
+
+
+def save(maps: dict[str, np.ndarray], path: str, images: bool = True):
+    """Сохраняет карты в сжатый .npz и, если нужно, PNG по каждому закону рядом с ним"""
+    np.savez_compressed(path, **maps)
+    if images:
+        base = os.path.splitext(path)[0]
+        for key in maps:
+            if key.endswith("_result"):
+                name = key[:-len("_result")]
+                to_image(maps[key], maps[f"{name}_time"]).save(f"{base}_{name}.png")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Карта зоны возможных пусков")
+    parser.add_argument("--x", nargs=4, default=["missile_x", "-1500", "1500", "200"],
+                        metavar=("PARAM", "START", "STOP", "COUNT"))
+    parser.add_argument("--y", nargs=4, default=["missile_y", "-1500", "1500", "200"],
+                        metavar=("PARAM", "START", "STOP", "COUNT"))
+    parser.add_argument("--laws", nargs="*", default=[law.__name__ for law in batch_laws.SCALAR_LAWS])
+    parser.add_argument("--N", type=float, default=const.N)
+    parser.add_argument("--turn", type=float, default=0.0, help="постоянное управление самолетом от -1 до 1")
+    parser.add_argument("--t-max", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="envelope.npz")
+    args = parser.parse_args()
+
+    axes = []
+    for param, start, stop, count in (args.x, args.y):
+        axes += [param, np.linspace(float(start), float(stop), int(count))]
+
+    start_time = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        maps = sweep(*axes, laws=[getattr(laws, name) for name in args.laws],
+                     N=args.N, turn=args.turn, t_max=args.t_max, pool=pool)
+    save(maps, args.out)
+    print(f"{maps['xs'].size * maps['ys'].size} клеток x {len(args.laws)} законов за {perf_counter() - start_time:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Поиск маневра уклонения самолета от закона наведения методом перекрестной энтропии (CEM).
+
+Маневр - кусочно-постоянное управление самолетом (turn, throttle) на отрезках длиной segment,
+как в headless.Schedule. Каждое поколение разыгрывается population маневров из нормального
+распределения с независимыми параметрами (значения обрезаются до [-1, 1]), все они считаются
+одним проходом: пакет делится на части по числу процессов, каждая часть - один
+headless.BatchSimulation. Оценка маневра - промах ракеты (наименьшее расстояние до самолета),
+а если ракета все же попала - время до попадания в долях const.plane_size: любой уход лучше
+любого попадания, а среди попаданий лучше то, что дольше оттягивает перехват (у TPN и ZEM
+уйти удается не всегда, и без этого все маневры оценивались бы одинаково).
+Среднее и разброс распределения сдвигаются к лучшей доле elite маневров, лучший найденный
+маневр всегда возвращается в следующее поколение, поэтому лучшая оценка не убывает.
+
+Лучшие маневры сохраняются как сценарии headless.Timeline в JSON вместе с законом, N, t_norm,
+dt и t_max, с которыми они искались. По ним main.py --script и headless.py --script повторяют
+тот же перехват (шаг физики по умолчанию тот же, что в окне).
+
+Пример:
+    python evasion.py --law TPN --generations 30 --population 256 --out evasion
+    python main.py --script evasion/TPN_1.json
+    python headless.py --script evasion/TPN_1.json
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import NamedTuple
+
+import numpy as np
+
+import batch_laws
+import const
+import headless
+import laws as laws_module
+import montecarlo
+import simulation
+
+
+class Search(NamedTuple):
+    """Параметры поиска"""
+    population: int = 256
+    generations: int = 30
+    elite: float = 0.1          # доля лучших маневров, по которым обновляется распределение
+    smoothing: float = 0.7      # вес нового среднего и разброса, остальное - от прошлого поколения
+    std_min: float = 0.05       # разброс не опускается ниже, чтобы поиск не замирал
+    segment: float = 1.0        # длительность отрезка маневра, с
+    dt: float = 1 / const.physics_rate
+    t_max: float = 60.0
+
+
+class Maneuver(NamedTuple):
+    """Найденный маневр и его итог"""
+    score: float
+    miss_distance: float
+    result: str                 # как в headless.Outcome: "hit", "win" или "timeout"
+    time: float                 # время попадания или победы, иначе t_max
+    turn: np.ndarray            # (K,) управление на отрезках
+    throttle: np.ndarray
+
+    def timeline(self, segment: float, **info) -> headless.Timeline:
+        """Сценарий маневра, info - сведения для файла сценария"""
+        times = np.arange(len(self.turn)) * segment
+        info = {**info, "result": self.result, "time": self.time, "miss_distance": self.miss_distance}
+        return headless.Timeline(zip(times, self.turn, self.throttle), info)
+
+
+def evaluate(law_code: int, N: float, t_norm: float, turn, throttle, search: Search = Search()) -> headless.BatchOutcome:
+    """Считает маневры одним пакетом из const.airplane_start и const.missile_start, как в окне.
+
+    Args:
+        law_code (int): индекс закона в batch_laws.LAWS
+        N (float): навигационная постоянная
+        t_norm (float): постоянная времени PP и APN
+        turn, throttle: массивы (P, K) управления на отрезках
+        search (Search): длина отрезка, шаг физики и предельное время
+
+    Returns:
+        headless.BatchOutcome: итоги маневров
+    """
+    turn = np.atleast_2d(turn)
+    count, segments = turn.shape
+    airplane_start = np.tile(np.asarray(const.airplane_start, dtype=np.float64), (count, 1))
+    sim = headless.BatchSimulation(law_code, N, airplane_start, const.missile_start, t_norm=t_norm)
+    schedule = headless.Schedule(np.arange(segments) * search.segment, turn, throttle)
+    return sim.run(schedule, search.dt, search.t_max)
+
+
+def score(outcome: headless.BatchOutcome, t_max: float) -> np.ndarray:
+    """Оценка маневров: промах, а при попадании - const.plane_size * время попадания / t_max"""
+    return np.where(outcome.hit, const.plane_size * outcome.time / t_max, outcome.miss_distance)
+
+
+def _evaluate_worker(law_code, N, t_norm, turn, throttle, search) -> headless.BatchOutcome:
+    return evaluate(law_code, N, t_norm, turn, throttle, search)
+
+
+def optimize(
+    law=laws_module.TPN,
+    N: float | None = None,
+    t_norm: float | None = None,
+    search: Search = Search(),
+    top: int = 3,
+    seed: int = 0,
+    pool: ProcessPoolExecutor | None = None,
+    workers: int | None = None,
+    progress=None,
+) -> list[Maneuver]:
+    """Ищет маневры, дающие наибольший промах ракеты с законом law.
+
+    Args:
+        law: закон из laws.py
+        N (float | None): навигационная постоянная, по умолчанию const.N
+        t_norm (float | None): постоянная времени PP и APN, по умолчанию laws.t_norm
+        search (Search): параметры поиска
+        top (int): сколько лучших маневров вернуть
+        seed (int): зерно, результат детерминирован
+        pool (ProcessPoolExecutor | None): пул процессов, по умолчанию создается на workers процессов
+        workers (int | None): число процессов пула, по умолчанию os.cpu_count() (см. montecarlo.worker_count)
+        progress: функция progress(generation, best_score, mean_score, hit_rate) после каждого поколения
+
+    Returns:
+        list[Maneuver]: лучшие различные маневры за весь поиск, по убыванию оценки
+    """
+    N = const.N if N is None else N
+    t_norm = laws_module.t_norm if t_norm is None else t_norm
+    workers = montecarlo.worker_count(workers)
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    code = batch_laws.SCALAR_LAWS.index(law)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(code,)))
+
+    segments = int(np.ceil(search.t_max / search.segment))
+    # параметры маневра: turn на отрезках, затем throttle
+    mean = np.zeros(2 * segments)
+    std = np.ones(2 * segments)
+    elite_count = max(1, int(search.elite * search.population))
+    best = {}   # параметры маневра (bytes) -> (оценка, промах, код итога, время), лучшие за весь поиск
+
+    try:
+        for generation in range(search.generations):
+            params = np.clip(mean + std * rng.standard_normal((search.population, 2 * segments)), -1.0, 1.0)
+            if best:
+                # лучший найденный маневр переходит в новое поколение без изменений
+                params[-1] = np.frombuffer(max(best, key=lambda key: best[key][0]))
+
+            parts = np.array_split(params, min(workers, len(params)))
+            futures = [
+                pool.submit(_evaluate_worker, code, N, t_norm, part[:, :segments], part[:, segments:], search)
+                for part in parts
+            ]
+            outcomes = [f.result() for f in futures]
+            outcome = headless.BatchOutcome(
+                *(np.concatenate(values) for values in zip(*(o[:3] for o in outcomes))),
+                steps=sum(o.steps for o in outcomes),
+            )
+            value = score(outcome, search.t_max)
+
+            order = np.argsort(-value, kind="stable")
+            elite = params[order[:elite_count]]
+            mean = search.smoothing * elite.mean(axis=0) + (1 - search.smoothing) * mean
+            std = np.maximum(search.smoothing * elite.std(axis=0) + (1 - search.smoothing) * std, search.std_min)
+
+            for i in order[:top]:
+                best[params[i].tobytes()] = (float(value[i]), float(outcome.miss_distance[i]),
+                                             int(outcome.result[i]), float(outcome.time[i]))
+            best = dict(sorted(best.items(), key=lambda item: -item[1][0])[:top])
+            if progress is not None:
+                progress(generation, float(value[order[0]]), float(value.mean()), float(outcome.hit.mean()))
+    finally:
+        if own_pool:
+            pool.shutdown(cancel_futures=True)
+
+    maneuvers = []
+    for key, (value, miss_distance, result, time) in best.items():
+        params = np.frombuffer(key)
+        maneuvers.append(Maneuver(value, miss_distance, headless.RESULTS[result], time,
+                                  params[:segments], params[segments:]))
+    return maneuvers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск маневра уклонения от закона наведения (CEM)")
+    parser.add_argument("--law", default="TPN", choices=[law.__name__ for law in batch_laws.SCALAR_LAWS])
+    parser.add_argument("--N", type=float, default=None, help="по умолчанию const.N или из --presets")
+    parser.add_argument("--presets", metavar="FILE", help="N и t_norm по законам из autotune.py")
+    parser.add_argument("--population", type=int, default=Search().population)
+    parser.add_argument("--generations", type=int, default=Search().generations)
+    parser.add_argument("--elite", type=float, default=Search().elite)
+    parser.add_argument("--segment", type=float, default=Search().segment, help="длительность отрезка маневра, с")
+    parser.add_argument("--dt", type=float, default=Search().dt)
+    parser.add_argument("--t-max", type=float, default=Search().t_max)
+    parser.add_argument("--top", type=int, default=3, help="сколько лучших маневров сохранить")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="evasion", metavar="DIR", help="папка для сценариев")
+    args = parser.parse_args()
+
+    law = getattr(laws_module, args.law)
+    N, t_norm = const.N, laws_module.t_norm
+    if args.presets:
+        try:
+            N, t_norm = simulation.load_presets(args.presets).get(args.law, (N, t_norm))
+        except ValueError as e:
+            parser.error(str(e))
+    if args.N is not None:
+        N = args.N
+    search = Search(args.population, args.generations, args.elite, segment=args.segment, dt=args.dt,
+                    t_max=args.t_max)
+
+    def progress(generation, best_score, mean_score, hit_rate):
+        print(f"поколение {generation}: лучшая оценка {best_score:.3f}, средняя {mean_score:.3f}, "
+              f"поражение {hit_rate:.1%}", flush=True)
+
+    start_time = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        maneuvers = optimize(law, N, t_norm, search, args.top, args.seed, pool, args.workers, progress)
+    print(f"Поиск занял {perf_counter() - start_time:.1f} с")
+
+    os.makedirs(args.out, exist_ok=True)
+    for rank, maneuver in enumerate(maneuvers, 1):
+        path = os.path.join(args.out, f"{args.law}_{rank}.json")
+        timeline = maneuver.timeline(search.segment, law=args.law, N=N, t_norm=t_norm, dt=search.dt,
+                                     t_max=search.t_max)
+        # проверка тем же перехватом в Simulation, которым сценарий будет воспроизводиться
+        check = headless.run(law, N, timeline, search.dt, search.t_max, t_norm=t_norm)
+        timeline.save(path)
+        print(f"{path}: {maneuver.result} за {maneuver.time:.2f} с, промах {maneuver.miss_distance:.2f} "
+              f"(Simulation: {check.result} за {check.time:.2f} с, промах {check.miss_distance:.2f})")
+
+
+if __name__ == "__main__":
+    main()
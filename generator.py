@@ -1,9 +1,12 @@
 from time import perf_counter
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image
 from concurrent.futures import ProcessPoolExecutor, InterpreterPoolExecutor
+import image_writer
 import parallel_generation
+import terrain_cache
 
 # Параметры генерации
 width, height = 4000, 4000
@@ -31,92 +34,131 @@ octaves = 6
 persistence = 0.5
 lacunarity = 2.0
 
+# Пирамида тайлов для отрисовки по частям (land_tiles.py)
+tile_size = 512
+tiles_dir = "tiles"
+
+# Пул воркеров генерации. InterpreterPoolExecutor тоже работает, но в субинтерпретаторах
+# шум считается на чистом Python (simplex_scalar) и это в сотни раз медленнее
+pool_type = ProcessPoolExecutor
+
+# Кэш слоев карты (terrain_cache.py): повторный запуск с теми же параметрами шума только перекрашивает карту
+cache_dir = "terrain_cache"
+cache_size = 2 * 1024**3
+
 # Дополнительный шум для цветовой вариативности
 color_noise_scale = 50.0
 color_noise_intensity = 0.20
 
+# Ширина плавного перехода между соседними биомами (по высоте в каждую сторону от порога)
+transition_width = 0.02
+
+# Пороги высот и цвета биомов снизу вверх: ниже первого порога - deep_ocean_color
+biomes = [
+    (deep_ocean_height, ocean_color),
+    (ocean_height, beach_color),
+    (beach_height, plain_color),
+    (plain_height, forest_color),
+    (forest_height, mountain_color),
+    (mountain_height, snow_mountain_color),
+]
+
+# Полосы строк, которыми карта раскрашивается и пишется на диск
+strip_rows = 256
+
+
+def color_lut():
+    """Таблица цвета от высоты для np.interp: внутри биома цвет постоянный, в переходе
+    [порог - transition_width, порог + transition_width] линейно меняется к цвету следующего биома
+
+    Returns:
+        tuple: высоты опорных точек (2 * len(biomes),) и цвета в них (2 * len(biomes), 3)
+    """
+    heights, colors = [], []
+    previous = deep_ocean_color
+    for threshold, color in biomes:
+        heights += [threshold - transition_width, threshold + transition_width]
+        colors += [previous, color]
+        previous = color
+    return np.array(heights), np.array(colors, dtype=np.float64)
+
+
+_lut = color_lut()
+
+
 def height_to_color(height_map, color_variation):
-    height_map = np.array(height_map)
-    color_variation = np.array(color_variation)
-    color_map = np.zeros((*height_map.shape, 3), dtype=np.uint8)
-    
-    # Маски для каждого биома
-    deep_ocean_mask = height_map < deep_ocean_height
-    ocean_mask = (height_map >= deep_ocean_height) & (height_map < ocean_height)
-    beach_mask = (height_map >= ocean_height) & (height_map < beach_height)
-    plain_mask = (height_map >= beach_height) & (height_map < plain_height)
-    forest_mask = (height_map >= plain_height) & (height_map < forest_height)
-    mountain_mask = (height_map >= forest_height) & (height_map < mountain_height)
-    snow_mountain_mask = height_map >= mountain_height
-    
-    # Базовые цвета для биомов с вариациями
-    def apply_variation(base_color, mask, variation):
-        color = np.array(base_color, dtype=np.float32)
-        # Применяем вариацию (темнее-светлее)
-        variation_factor = 1.0 + variation[mask] * 0.5  # От 0.85 до 1.15
-        varied_color = color * variation_factor[..., np.newaxis]
-        # Ограничиваем значения 0-255
-        return np.clip(varied_color, 0, 255).astype(np.uint8)
-    
-    # Применяем цветовые вариации к каждому биому
-    color_map[deep_ocean_mask] = apply_variation(deep_ocean_color, deep_ocean_mask, color_variation)
-    color_map[ocean_mask] = apply_variation(ocean_color, ocean_mask, color_variation)
-    color_map[beach_mask] = apply_variation(beach_color, beach_mask, color_variation)
-    color_map[plain_mask] = apply_variation(plain_color, plain_mask, color_variation)
-    color_map[forest_mask] = apply_variation(forest_color, forest_mask, color_variation)
-    color_map[mountain_mask] = apply_variation(mountain_color, mountain_mask, color_variation)
-    color_map[snow_mountain_mask] = apply_variation(snow_mountain_color, snow_mountain_mask, color_variation)
-    
-    # Плавные переходы между биомами
-    transition_width = 0.02
-    
-    transitions = [
-        (deep_ocean_height, deep_ocean_color, ocean_color),
-        (ocean_height, ocean_color, beach_color),
-        (beach_height, beach_color, plain_color),
-        (plain_height, plain_color, forest_color),
-        (forest_height, forest_color, mountain_color),
-        (mountain_height, mountain_color, snow_mountain_color)
-    ]
-    
-    for height_val, color1, color2 in transitions:
-        transition_mask = (height_map >= height_val - transition_width) & (height_map < height_val + transition_width)
-        if np.any(transition_mask):
-            factor = (height_map[transition_mask] - (height_val - transition_width)) / (2 * transition_width)
-            base_color = np.array(color1) * (1 - factor[..., np.newaxis]) + np.array(color2) * factor[..., np.newaxis] # type: ignore
-            # Применяем вариацию к переходной зоне
-            variation_factor = 1.0 + color_variation[transition_mask] * 0.5
-            varied_color = base_color * variation_factor[..., np.newaxis]
-            color_map[transition_mask] = np.clip(varied_color, 0, 255).astype(np.uint8)
-    
-    return color_map
+    """Цвета куска карты по высотам и вариации цвета (темнее-светлее)
+
+    Args:
+        height_map: высоты, массив любой формы
+        color_variation: вариация цвета той же формы
+
+    Returns:
+        np.ndarray: цвета (*height_map.shape, 3) uint8
+    """
+    # пороги сравниваются в float64, как и раньше, когда карта была списком float
+    height_map = np.asarray(height_map, dtype=np.float64)
+    color_variation = np.asarray(color_variation, dtype=np.float64)
+    heights, colors = _lut
+    base_color = np.stack([np.interp(height_map, heights, colors[:, c]) for c in range(3)], axis=-1)
+    variation_factor = 1.0 + color_variation * 0.5  # От 0.9 до 1.1
+    return np.clip(base_color * variation_factor[..., np.newaxis], 0, 255).astype(np.uint8)
+
+
+def colorize(height_map, color_variation, writers, strip=strip_rows):
+    """Раскрашивает карту полосами по strip строк и отдает каждую полосу писателям из image_writer.
+    Карты могут быть np.memmap - в памяти одновременно только одна полоса"""
+    for start in range(0, len(height_map), strip):
+        rows = height_to_color(height_map[start:start + strip], color_variation[start:start + strip])
+        for writer in writers:
+            writer.write(rows)
 
 
 if __name__ == '__main__':
     # Генерация данных
-    pool = ProcessPoolExecutor(max_workers=8)
+    pool = pool_type(max_workers=os.cpu_count())
+
+    def progress(done, total, eta):
+        print(f"\r{done}/{total} тайлов, осталось {eta:.1f} с ", end="" if done < total else "\n", flush=True)
     
     print('start generation')
     start_time = perf_counter()
     print('generating heigth_map...')
-    
-    height_map = parallel_generation.vectorized_noise(width, height, scale, octaves, persistence, lacunarity, seed, pool)
-    
+    cache = terrain_cache.TerrainCache(cache_dir, cache_size)
+
+    height_map = cache.layer(
+        "height",
+        dict(width=width, height=height, scale=scale, octaves=octaves,
+             persistence=persistence, lacunarity=lacunarity, seed=seed),
+        (width, height),
+        lambda grid: parallel_generation.vectorized_noise(
+            width, height, scale, octaves, persistence, lacunarity, seed, pool, out=grid, progress=progress),
+    )
+
     print(f"height_map done in {perf_counter()-start_time}")
     start_time = perf_counter()
     print('generating color_variation...')
-    
-    color_variation = parallel_generation.vectorized_color(width, height, color_noise_scale, color_noise_intensity, seed, pool)
-    
+
+    color_variation = cache.layer(
+        "variation",
+        dict(width=width, height=height, scale=color_noise_scale, intensity=color_noise_intensity, seed=seed),
+        (width, height),
+        lambda grid: parallel_generation.vectorized_color(
+            width, height, color_noise_scale, color_noise_intensity, seed, pool, out=grid, progress=progress),
+    )
+
     print(f"color_variation done in {perf_counter()-start_time}")
     start_time = perf_counter()
-    
-    color_map = height_to_color(height_map, color_variation)
 
-    # Сохранение и отображение
-    image = Image.fromarray(color_map)
-    image.save("land.png")
+    # карта хранится как [i][j], i - строка картинки
+    size = (height, width)
+    with image_writer.PngWriter("land.png", size) as png, image_writer.TileWriter(tiles_dir, size, tile_size) as tiles:
+        colorize(height_map, color_variation, (png, tiles))
+    print(f"color map done in {perf_counter()-start_time}")
+    del height_map, color_variation
+    pool.shutdown()
 
-    plt.imshow(color_map)
+    # Отображение самого грубого уровня пирамиды, он помещается в один тайл
+    plt.imshow(Image.open(os.path.join(tiles_dir, str(tiles.levels - 1), "0_0.png")))
     plt.axis("off")
-    plt.show()
\ No newline at end of file
+    plt.show()
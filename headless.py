@@ -0,0 +1,286 @@
+"""Запуск симуляции без окна и без arcade.
+
+Simulation.update шагает с фиксированным dt так быстро, как позволяет процессор,
+а самолет управляется сценарием вместо клавиатуры. Подходит для пакетных расчетов
+на серверах без дисплея. BatchSimulation делает то же самое сразу для множества
+независимых перехватов в одном BodyArray.
+
+Пример:
+    python headless.py --law TPN --N 4 --controls "0 1 0" "3 -1 1"
+    python headless.py --script evasion/TPN_1.json
+"""
+
+import argparse
+import json
+from bisect import bisect_right
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+import bodies
+import collision
+import const
+import laws
+from simulation import Simulation
+
+# Управление самолетом: (turn, throttle) в долях от предельных ускорений, как в Simulation.control
+Policy = Callable[[float, Simulation], tuple[float, float]]
+
+
+class Timeline:
+    """Кусочно-постоянный сценарий управления самолетом.
+
+    Args:
+        points: список (t, turn, throttle) - с момента t действует управление turn, throttle.
+            До первой точки самолет летит прямо.
+        info (dict | None): сведения о сценарии, сохраняются вместе с ним
+    """
+    def __init__(self, points, info=None):
+        self.points = sorted((float(t), float(turn), float(throttle)) for t, turn, throttle in points)
+        self.times = [p[0] for p in self.points]
+        self.info = info or {}  # поля файла сценария кроме points (закон, N, итог и т.п.)
+
+    def __call__(self, t: float, sim: Simulation | None = None) -> tuple[float, float]:
+        i = bisect_right(self.times, t) - 1
+        if i < 0:
+            return 0.0, 0.0
+        return self.points[i][1], self.points[i][2]
+
+    @classmethod
+    def load(cls, path: str) -> "Timeline":
+        """Сценарий из JSON-файла с ключом "points" (например, сохраненный evasion.py)"""
+        with open(path) as f:
+            data = json.load(f)
+        points = data.pop("points")
+        return cls(points, data)
+
+    def save(self, path: str):
+        """Сохраняет сценарий и info в JSON"""
+        with open(path, "w") as f:
+            json.dump({**self.info, "points": [list(p) for p in self.points]}, f, indent=2)
+
+
+class Outcome(NamedTuple):
+    """Итог одного перехвата"""
+    result: str             # "hit" - цель перехвачена, "win" - самолет долетел до зоны победы, "timeout"
+    time: float             # время перехвата или победы (точное, внутри шага), иначе время окончания симуляции
+    miss_distance: float    # минимальное расстояние между ракетой и самолетом
+    steps: int              # число шагов физики
+
+    @property
+    def hit(self) -> bool:
+        return self.result == "hit"
+
+
+def run(
+    law=laws.TPN,
+    N=const.N,
+    controls: Policy | Timeline | list | None = None,
+    dt: float = 1 / const.physics_rate,
+    t_max: float = 120.0,
+    airplane_start=None,
+    missile_start=None,
+    t_norm=None,
+) -> Outcome:
+    """Проводит один перехват без отрисовки.
+
+    Args:
+        law: закон наведения из laws.py
+        N: навигационная постоянная
+        controls: сценарий управления - Timeline, список (t, turn, throttle) или функция policy(t, sim) -> (turn, throttle).
+            None - самолет летит прямо
+        dt (float): фиксированный шаг физики, по умолчанию как в окне (1 / const.physics_rate)
+        t_max (float): предельное время симуляции
+        airplane_start: начальные условия самолета, по умолчанию const.airplane_start
+        missile_start: начальные условия ракеты, по умолчанию const.missile_start
+        t_norm: постоянная времени PP и APN, по умолчанию laws.t_norm
+
+    Returns:
+        Outcome: итог перехвата
+    """
+    if isinstance(controls, (list, tuple)):
+        controls = Timeline(controls)
+    presets = {law.__name__: (N, t_norm)} if t_norm is not None else None
+    sim = Simulation(law, N, airplane_start, missile_start, record_trajectory=False, presets=presets)
+    sim.running = True
+    steps = 0
+    while not sim.game_over and sim.time < t_max:
+        if controls is not None:
+            sim.control(*controls(sim.time, sim))
+        sim.update(dt)
+        steps += 1
+
+    if sim.win:
+        result = "win"
+    elif sim.game_over:
+        result = "hit"
+    else:
+        result = "timeout"
+    return Outcome(result, sim.event_time if sim.game_over else sim.time, sim.miss_distance, steps)
+
+
+class Schedule:
+    """Кусочно-постоянные сценарии управления для пакета перехватов.
+
+    Args:
+        times: массив (K,) моментов переключения управления по возрастанию
+        turn: массив (M, K) - turn на каждом отрезке для каждого перехвата
+        throttle: массив (M, K) - throttle на каждом отрезке, по умолчанию 0
+    """
+    def __init__(self, times, turn, throttle=None):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.turn = np.atleast_2d(turn)
+        self.throttle = np.zeros_like(self.turn) if throttle is None else np.atleast_2d(throttle)
+
+    def __call__(self, t: float, sim=None) -> tuple[np.ndarray, np.ndarray]:
+        i = np.searchsorted(self.times, t, side="right") - 1
+        if i < 0:
+            return np.zeros(len(self.turn)), np.zeros(len(self.turn))
+        return self.turn[:, i], self.throttle[:, i]
+
+
+# Коды итогов в BatchOutcome.result
+TIMEOUT, HIT, WIN = 0, 1, 2
+RESULTS = ("timeout", "hit", "win")
+
+
+class BatchOutcome(NamedTuple):
+    """Итоги пакета перехватов, по элементу массива на перехват"""
+    result: np.ndarray          # код итога: TIMEOUT, HIT или WIN
+    time: np.ndarray
+    miss_distance: np.ndarray
+    steps: int                  # число шагов физики всего пакета
+
+    @property
+    def hit(self) -> np.ndarray:
+        return self.result == HIT
+
+
+class BatchSimulation:
+    """Множество независимых перехватов самолет-ракета, которые считаются одним BodyArray.
+
+    Логика та же, что в Simulation.update: самолет и ракета двигаются, затем проверяются
+    поражение и попадание в зону победы. Закончившиеся перехваты замораживаются.
+
+    Args:
+        law: закон наведения или массив (M,) индексов законов в batch_laws.LAWS
+        N: навигационная постоянная или массив (M,)
+        airplane_start: массив (M, 5) начальных условий самолетов
+        missile_start: массив (M, 5) начальных условий ракет
+        t_norm: постоянная времени PP и APN или массив (M,), по умолчанию laws.t_norm
+    """
+    def __init__(self, law, N, airplane_start, missile_start, t_norm=None):
+        airplane_start = np.asarray(airplane_start, dtype=np.float64).reshape(-1, 5)
+        missile_start = np.broadcast_to(np.asarray(missile_start, dtype=np.float64), airplane_start.shape)
+        m = len(airplane_start)
+        self.store = bodies.BodyArray(2 * m)
+        self.planes = self.store.add_airplanes(airplane_start)
+        self.missiles = self.store.add_missiles(missile_start, law, self.planes, N, t_norm)
+        self.time = 0.0
+        self.steps = 0
+        self.result = np.full(m, TIMEOUT, dtype=np.int8)
+        self.done = np.zeros(m, dtype=bool)
+        self.end_time = np.zeros(m)
+        self.miss_distance = self.distance()
+
+    def __len__(self):
+        return len(self.planes)
+
+    def distance(self) -> np.ndarray:
+        """Текущие расстояния между ракетами и самолетами"""
+        s = self.store
+        return np.hypot(s.x[self.missiles] - s.x[self.planes], s.y[self.missiles] - s.y[self.planes])
+
+    def control(self, turn, throttle):
+        """Векторный аналог Simulation.control"""
+        s = self.store
+        speed = s.current_speed[self.planes]
+        s.an[self.planes] = turn * const.acceleration_n * np.abs(speed / const.airplane_max_speed)
+        s.at[self.planes] = np.where(
+            throttle > 0, throttle * const.acceleration_t / 2, throttle * const.acceleration_t
+        )
+
+    def update(self, dt):
+        s = self.store
+        planes, missiles = self.planes, self.missiles
+        # движение в начале шага для поиска столкновений по всему шагу
+        px, py, pvx, pvy = s.x[planes], s.y[planes], s.vx[planes], s.vy[planes]
+        rx, ry = s.x[missiles] - px, s.y[missiles] - py
+        rvx, rvy = s.vx[missiles] - pvx, s.vy[missiles] - pvy
+
+        s.calc_move(dt)
+        running = ~self.done
+
+        hit_motion = (rx, ry, rvx, rvy, s.ax[missiles] - s.ax[planes], s.ay[missiles] - s.ay[planes])
+        t_hit, distance = collision.closest_approach(*hit_motion, dt)
+        self.miss_distance = np.where(running, np.minimum(self.miss_distance, distance), self.miss_distance)
+        hit = running & (distance < const.plane_size)
+
+        win_motion = (px, py, pvx, pvy, s.ax[planes], s.ay[planes])
+        t_win, win_distance = collision.closest_approach(*win_motion, dt)
+        win = running & (win_distance < const.win_zone_r)
+
+        if hit.any() or win.any():
+            t_hit = np.where(hit, collision.entry_time(*hit_motion, t_hit, const.plane_size), np.inf)
+            t_win = np.where(win, collision.entry_time(*win_motion, t_win, const.win_zone_r), np.inf)
+            hit &= t_hit <= t_win
+            win &= ~hit
+            self.result[hit] = HIT
+            self.result[win] = WIN
+            finished = hit | win
+            self.done |= finished
+            self.end_time[finished] = self.time + np.minimum(t_hit, t_win)[finished]
+            s.active[planes[finished]] = False
+            s.active[missiles[finished]] = False
+        self.time += dt
+        self.steps += 1
+
+    def run(self, controls=None, dt: float = 1 / const.physics_rate, t_max: float = 120.0) -> BatchOutcome:
+        """Шагает пакет до окончания всех перехватов или до t_max.
+
+        Args:
+            controls: Schedule или функция policy(t, sim) -> (turn, throttle) с массивами (M,).
+                None - самолеты летят прямо
+            dt (float): фиксированный шаг физики, по умолчанию как в окне (1 / const.physics_rate)
+            t_max (float): предельное время симуляции
+
+        Returns:
+            BatchOutcome: итоги перехватов
+        """
+        while not self.done.all() and self.time < t_max:
+            if controls is not None:
+                self.control(*controls(self.time, self))
+            self.update(dt)
+        end_time = np.where(self.done, self.end_time, self.time)
+        return BatchOutcome(self.result.copy(), end_time, self.miss_distance.copy(), self.steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перехват без отрисовки")
+    parser.add_argument("--law", default=None, choices=[law.__name__ for law in Simulation().laws.values()],
+                        help="по умолчанию TPN или закон из --script")
+    parser.add_argument("--N", type=float, default=None, help="по умолчанию const.N или из --script")
+    parser.add_argument("--t-norm", type=float, default=None, help="по умолчанию laws.t_norm или из --script")
+    parser.add_argument("--dt", type=float, default=None, help="по умолчанию 1 / const.physics_rate или из --script")
+    parser.add_argument("--t-max", type=float, default=None, help="по умолчанию 120 с или из --script")
+    parser.add_argument("--controls", nargs="*", default=[], metavar="'t turn throttle'",
+                        help="точки сценария управления самолетом")
+    parser.add_argument("--script", metavar="FILE", help="сценарий управления из JSON (Timeline.save)")
+    args = parser.parse_args()
+
+    # закон и параметры, с которыми сценарий искался (evasion.py), явные флаги важнее
+    settings = {"law": "TPN", "N": const.N, "t_norm": laws.t_norm, "dt": 1 / const.physics_rate, "t_max": 120.0}
+    if args.script:
+        controls = Timeline.load(args.script)
+        settings.update((key, controls.info[key]) for key in settings if key in controls.info)
+    else:
+        controls = [tuple(map(float, point.split())) for point in args.controls] or None
+    settings.update((key, value) for key, value in vars(args).items() if key in settings and value is not None)
+
+    outcome = run(getattr(laws, settings["law"]), settings["N"], controls, settings["dt"], settings["t_max"],
+                  t_norm=settings["t_norm"])
+    print(outcome)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Запись больших картинок по полосам строк, без сборки всей картинки в памяти.
+
+Писатели принимают полосы (rows, width, 3) uint8 сверху вниз через write(rows):
+- PngWriter - один PNG, строки сжимаются zlib по мере поступления;
+- TileWriter - пирамида тайлов для land_tiles.TileMap.
+"""
+
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class PngWriter:
+    """PNG (RGB, 8 бит), который пишется на диск по полосам строк.
+
+    Args:
+        path (str): файл картинки
+        size (tuple[int, int]): (ширина, высота) картинки
+        compression (int): уровень сжатия zlib от 0 до 9
+    """
+    def __init__(self, path: str, size: tuple[int, int], compression: int = 6):
+        self.width, self.height = size
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._zlib = zlib.compressobj(compression)
+        self._file.write(_PNG_SIGNATURE)
+        # IHDR: размеры, 8 бит на канал, цветовой тип 2 (RGB), без чересстрочности
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(kind + data)
+        self._file.write(struct.pack(">I", zlib.crc32(kind + data)))
+
+    def write(self, rows: np.ndarray):
+        """Дописывает полосу строк (n, width, 3) uint8"""
+        rows = np.asarray(rows, dtype=np.uint8).reshape(len(rows), -1)
+        if rows.shape[1] != 3 * self.width:
+            raise ValueError(f"Ожидалась ширина {self.width}, получено {rows.shape[1] // 3}")
+        # каждая строка PNG начинается с байта фильтра, 0 - без фильтра
+        scanlines = np.zeros((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        scanlines[:, 1:] = rows
+        data = self._zlib.compress(scanlines.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+        self.rows += len(rows)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._chunk(b"IDAT", self._zlib.flush())
+        self._chunk(b"IEND", b"")
+        self._file.close()
+        if self.rows != self.height:
+            raise ValueError(f"Записано {self.rows} строк из {self.height}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TileWriter:
+    """Пирамида тайлов: уровень 0 - полное разрешение, каждый следующий уменьшен вдвое,
+    последний помещается в один тайл. Тайлы лежат в path/{уровень}/{строка}_{столбец}.png,
+    размеры карты - в path/meta.json.
+
+    В памяти держится только одна полоса высотой в тайл на каждый уровень:
+    заполненная полоса режется на тайлы, а ее уменьшенная вдвое копия уходит следующему уровню.
+
+    Args:
+        path (str): папка пирамиды
+        size (tuple[int, int]): (ширина, высота) карты на этом уровне
+        tile (int): сторона тайла в пикселях
+        level (int): номер уровня (следующие уровни создаются сами)
+    """
+    def __init__(self, path: str, size: tuple[int, int], tile: int = 512, level: int = 0):
+        self.path, self.tile, self.level = path, tile, level
+        self.width, self.height = size
+        self._band = np.empty((tile, self.width, 3), dtype=np.uint8)
+        self._filled = 0
+        self._band_index = 0
+        self._odd_row = None    # строка без пары, ждет следующую полосу для уменьшения
+        os.makedirs(os.path.join(path, str(level)), exist_ok=True)
+
+        self.next = None
+        if max(size) > tile:
+            self.next = TileWriter(path, (max(1, self.width // 2), max(1, self.height // 2)), tile, level + 1)
+
+    @property
+    def levels(self) -> int:
+        """Число уровней пирамиды начиная с этого"""
+        return 1 + (self.next.levels if self.next else 0)
+
+    def write(self, rows: np.ndarray):
+        """Дописывает полосу строк (n, width, 3) uint8"""
+        rows = np.asarray(rows, dtype=np.uint8)
+        start = 0
+        while start < len(rows):
+            count = min(self.tile - self._filled, len(rows) - start)
+            self._band[self._filled:self._filled + count] = rows[start:start + count]
+            self._filled += count
+            start += count
+            if self._filled == self.tile:
+                self._save_band()
+        if self.next is not None:
+            self._downsample(rows)
+
+    def _save_band(self):
+        band = self._band[:self._filled]
+        for column, x in enumerate(range(0, self.width, self.tile)):
+            Image.fromarray(band[:, x:x + self.tile]).save(
+                os.path.join(self.path, str(self.level), f"{self._band_index}_{column}.png")
+            )
+        self._band_index += 1
+        self._filled = 0
+
+    def _downsample(self, rows: np.ndarray):
+        """Среднее по квадратам 2x2 для следующего уровня, непарные последние строка и столбец отбрасываются"""
+        if self._odd_row is not None:
+            rows = np.concatenate((self._odd_row, rows))
+            self._odd_row = None
+        if len(rows) % 2:
+            self._odd_row = rows[-1:].copy()
+            rows = rows[:-1]
+        if not len(rows):
+            return
+        half = self.next.width
+        quads = rows[:, :2 * half].reshape(len(rows) // 2, 2, half, 2, 3).astype(np.uint16)
+        self.next.write(((quads.sum(axis=(1, 3)) + 2) // 4).astype(np.uint8))
+
+    def close(self):
+        if self._filled:
+            self._save_band()
+        if self.next is not None:
+            self.next.close()
+        if self.level == 0:
+            with open(os.path.join(self.path, "meta.json"), "w") as f:
+                json.dump({"width": self.width, "height": self.height, "tile": self.tile, "levels": self.levels}, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,150 @@
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil, floor, hypot, log2, sqrt
+
+import arcade
+from PIL import Image
+
+import const
+
+# Отступ вокруг текстуры в атласе, пиксели
+ATLAS_BORDER = 2
+
+
+class TileMap:
+    """Карта местности из пирамиды тайлов (generator.py, image_writer.TileWriter).
+
+    Самый грубый уровень (один тайл) грузится сразу и рисуется всегда, поверх него -
+    тайлы уровня, подходящего под текущий масштаб камеры. Видимые тайлы читаются
+    в фоновых потоках, текстуры живут в LRU-кэше на const.land_tile_cache тайлов.
+
+    Args:
+        path (str): папка с пирамидой (в ней meta.json)
+        screen_size (tuple[int, int]): размер окна в пикселях
+    """
+    def __init__(self, path: str, screen_size: tuple[int, int]):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.path = path
+        self.width, self.height = meta["width"], meta["height"]
+        self.tile, self.levels = meta["tile"], meta["levels"]
+        self.screen_size = screen_size
+
+        # атлас сразу на весь кэш тайлов, чтобы он не рос при заполнении. Место выгруженных
+        # текстур атлас сам не переиспользует, поэтому, когда места нет, он перепаковывается
+        # (rebuild) с одними живыми тайлами того же размера
+        per_row = ceil(sqrt(const.land_tile_cache))
+        side = per_row * (self.tile + 2 * ATLAS_BORDER)
+        self.atlas = arcade.DefaultTextureAtlas((side, side), border=ATLAS_BORDER)
+        self.atlas_slots = per_row * per_row
+        self.atlas_used = 0
+        self.overview = arcade.SpriteList()
+        self.sprites = arcade.SpriteList(atlas=self.atlas)
+        self.cache: OrderedDict[tuple[int, int, int], arcade.Sprite] = OrderedDict()
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="land")
+
+        top = self.levels - 1
+        self.overview.append(self._sprite((top, 0, 0), Image.open(self._tile_path((top, 0, 0)))))
+
+    def _tile_path(self, key) -> str:
+        level, row, column = key
+        return os.path.join(self.path, str(level), f"{row}_{column}.png")
+
+    def _load(self, key) -> Image.Image:
+        image = Image.open(self._tile_path(key))
+        image.load()
+        return image
+
+    def _sprite(self, key, image: Image.Image) -> arcade.Sprite:
+        """Спрайт тайла в мировых координатах: 1 пиксель уровня 0 - единица длины, центр карты в (0, 0)"""
+        level, row, column = key
+        pixel = 2 ** level
+        texture = arcade.Texture(
+            image.convert("RGBA"),
+            hash=f"land_{level}_{row}_{column}",
+            hit_box_algorithm=arcade.hitbox.algo_bounding_box,
+        )
+        left = -self.width / 2 + column * self.tile * pixel
+        top = self.height / 2 - row * self.tile * pixel
+        return arcade.Sprite(
+            texture, pixel,
+            center_x=left + image.width * pixel / 2,
+            center_y=top - image.height * pixel / 2,
+        )
+
+    def level_for(self, zoom: float) -> int:
+        """Уровень пирамиды для масштаба камеры zoom (пикселей экрана на единицу длины).
+
+        Самый подробный уровень, у которого пиксель тайла не мельче пикселя экрана и все тайлы
+        в круге вокруг экрана помещаются в кэш const.land_tile_cache. При отдалении камеры
+        тайлов уровня 0 становится слишком много, и выбирается более грубый уровень.
+        """
+        level = min(self.levels - 1, max(0, floor(-log2(zoom))))
+        diameter = hypot(*self.screen_size) / zoom
+        while level < self.levels - 1:
+            span = self.tile * 2 ** level
+            # наибольшее число тайлов в круге при любом положении камеры
+            columns = min(floor(diameter / span) + 2, -(-self.width // span))
+            rows = min(floor(diameter / span) + 2, -(-self.height // span))
+            if rows * columns <= const.land_tile_cache:
+                break
+            level += 1
+        return level
+
+    def visible(self, x: float, y: float, zoom: float) -> list[tuple[int, int, int]]:
+        """Тайлы, попадающие в круг, описанный вокруг экрана (камера может быть повернута)"""
+        level = self.level_for(zoom)
+        span = self.tile * 2 ** level
+        rows = -(-self.height // span)
+        columns = -(-self.width // span)
+        r = hypot(*self.screen_size) / 2 / zoom
+        c0 = max(0, floor((x - r + self.width / 2) / span))
+        c1 = min(columns - 1, floor((x + r + self.width / 2) / span))
+        r0 = max(0, floor((self.height / 2 - y - r) / span))
+        r1 = min(rows - 1, floor((self.height / 2 - y + r) / span))
+        return [(level, row, column) for row in range(r0, r1 + 1) for column in range(c0, c1 + 1)]
+
+    def update(self, x: float, y: float, zoom: float):
+        """Заказывает загрузку видимых тайлов, забирает готовые и выгружает давно не видимые"""
+        visible = self.visible(x, y, zoom)
+        for key in visible:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            elif key not in self.pending:
+                self.pending[key] = self.executor.submit(self._load, key)
+
+        visible = set(visible)
+        for key in [key for key, f in self.pending.items() if f.done()]:
+            image = self.pending.pop(key).result()
+            # место в кэше и в атласе освобождается до того, как тайл туда попадет
+            self._evict(visible, const.land_tile_cache - 1)
+            if self.atlas_used >= self.atlas_slots:
+                self.atlas.rebuild()
+                self.atlas_used = len(self.cache)
+            sprite = self._sprite(key, image)
+            self.atlas_used += 1
+            self.cache[key] = sprite
+            self.sprites.append(sprite)
+
+        for key, sprite in self.cache.items():
+            sprite.visible = key in visible
+
+    def _evict(self, visible: set, size: int):
+        """Выгружает давно не видимые тайлы, пока в кэше больше size тайлов"""
+        while len(self.cache) > size:
+            key, sprite = next(iter(self.cache.items()))
+            if key in visible:
+                break
+            # текстура уходит из атласа, когда на нее не остается ссылок
+            del self.cache[key]
+            self.sprites.remove(sprite)
+
+    def draw(self):
+        self.overview.draw()
+        self.sprites.draw()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,8 +1,12 @@
 from math import atan2, pi
+from typing import TYPE_CHECKING
 from numpy import sign, clip
-import const, bodies
+import const
 
-t_norm = 1
+if TYPE_CHECKING:
+    import bodies
+
+t_norm = 1     # постоянная времени PP и APN по умолчанию, у каждой ракеты своя (Missile.t_norm)
 
 def norm_a(vx: float, vy: float, a: float) -> list[float]:
     """Раскладывает ускорение объекта на составляющие так, что они перпендикулярны скорости.
@@ -79,7 +83,7 @@ def PP(target: "bodies.Airplane", pursuer: "bodies.Missile", N: int, dt: float)
     
     angle_diff = (angle_diff + pi) % (2 * pi) - pi
     
-    a = N * (angle_diff * vp) / t_norm
+    a = N * (angle_diff * vp) / pursuer.t_norm
     
     return a
 
@@ -144,7 +148,7 @@ def APN(target: "bodies.Airplane", pursuer: "bodies.Missile", N: int, dt: float)
     
     alpha_los = (d_numerator * denominator - numerator * d_denominator) / (denominator ** 2)
     
-    a = (los_rate + 0.5 * alpha_los * t_norm) * vp * N
+    a = (los_rate + 0.5 * alpha_los * pursuer.t_norm) * vp * N
     return a
 
 def ZEMPN(target: "bodies.Airplane", pursuer: "bodies.Missile", N: int, dt: float) -> float:
@@ -1,18 +1,72 @@
+import time
+START = time.perf_counter()     # отсчет времени запуска до первого кадра (--startup-check)
+
 import arcade
-import tkinter as tk
-import numpy as np
 import math
-import sys, os, time
+import sys, os, json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import const, simulation, profiler
+from trail_renderer import TrailRenderer
+from sprite_batch import BodySprites
+
+# цвета траекторий ракет в режиме сравнения законов, по порядку Simulation.laws
+LAW_COLORS = (
+    arcade.color.ORANGE_RED,
+    arcade.color.YELLOW,
+    arcade.color.CYAN,
+    arcade.color.MAGENTA,
+    arcade.color.LIME_GREEN,
+    arcade.color.DODGER_BLUE,
+)
+
+# размер окна задает init_screen() перед созданием окна, а не импорт модуля
+SCREEN_WIDTH, SCREEN_HEIGHT = 1920, 1080
 
-import const, simulation
 
-root = tk.Tk()
-root.withdraw()
-dpi = root.winfo_fpixels('1i')
-root.destroy()
-scale_factor = dpi / 96
+def app_dir() -> str:
+    """Папка программы, куда можно писать: рядом с .exe или с main.py"""
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def display_scale(display_size: tuple[int, int]) -> float:
+    """Масштаб интерфейса системы (DPI / 96).
+
+    Узнается через tkinter только при первом запуске на экране такого размера и хранится
+    в const.display_cache, дальше tkinter не загружается совсем.
+    """
+    path = os.path.join(app_dir(), const.display_cache)
+    key = f"{display_size[0]}x{display_size[1]}"
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if key not in cache:
+        import tkinter as tk
+
+        root = tk.Tk()
+        root.withdraw()
+        cache[key] = root.winfo_fpixels('1i') / 96
+        root.destroy()
+        try:
+            with open(path, "w") as f:
+                json.dump(cache, f)
+        except OSError:
+            pass    # папка только для чтения - просто спросим tkinter в следующий раз
+    return cache[key]
+
+
+def init_screen():
+    """Размер окна в логических пикселях с учетом масштаба интерфейса"""
+    global SCREEN_WIDTH, SCREEN_HEIGHT
+    display_size = arcade.get_display_size()
+    scale_factor = display_scale(display_size)
+    SCREEN_WIDTH, SCREEN_HEIGHT = [int(size // scale_factor) for size in display_size]     #int потому что иначе pylance ругается, хотя деление нацело
 
-SCREEN_WIDTH, SCREEN_HEIGHT = [int(size // scale_factor) for size in arcade.get_display_size()]     #int потому что иначе pylance ругается, хотя деление нацело
 
 def pixel_norm(FHD_size: float) -> float:
     return FHD_size * SCREEN_HEIGHT / 1080
@@ -39,9 +93,29 @@ def load_image(file_name: str):
         raise RuntimeError(f"Ошибка загрузки изображения: {str(e)}")
 
 
+def load_texture(file_name: str) -> arcade.Texture:
+    """Декодирует большое изображение в текстуру. Не трогает OpenGL, поэтому работает в фоновом потоке"""
+    from PIL import Image
+
+    image = Image.open(load_image(file_name)).convert("RGBA")
+    return arcade.Texture(image, hash=file_name, hit_box_algorithm=arcade.hitbox.algo_bounding_box)
+
+
 class ArcadeRenderer(arcade.Window):
-    """Главный класс, собирает вместе симуляцию и отрисовку"""
-    def __init__(self):
+    """Главный класс, собирает вместе симуляцию и отрисовку
+
+    Args:
+        replay (recorder.Replay | None): воспроизводить запись вместо симуляции
+        recording (recorder.Recorder | None): записывать каждый шаг физики
+        trace (bool): замерять кадры с начала и писать трассу (profiler.Profiler)
+        startup_check (bool): закрыться, когда загружено все, и сообщить время запуска
+        compare (bool): все законы сразу, по ракете на закон (simulation.ComparisonSimulation)
+        presets (dict | None): N и t_norm по законам (simulation.load_presets)
+        script: сценарий управления самолетом вместо клавиатуры (headless.Timeline)
+        law: закон наведения при запуске, по умолчанию PP
+    """
+    def __init__(self, replay=None, recording=None, trace=False, startup_check=False, compare=False, presets=None,
+                 script=None, law=simulation.laws.PP):
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, update_rate=1/const.FPS, vsync=True)
         self.set_fullscreen(True)
         self.cur_FPS = const.FPS
@@ -54,7 +128,21 @@ class ArcadeRenderer(arcade.Window):
             zoom=self.sim_scale,
         )
         self.keys_pressed = set()
-        self.sim = simulation.Simulation()
+        self.replay = replay
+        self.compare = compare
+        if replay is not None:
+            self.sim = replay
+        elif compare:
+            self.sim = simulation.ComparisonSimulation(presets=presets)
+        else:
+            self.sim = simulation.Simulation(law, recorder=recording, presets=presets)
+        if replay is None:
+            self.sim.script = script
+        self.profiler = profiler.Profiler(trace=trace)
+        self.show_profile = False
+        if replay is None:
+            # замер без правки самой симуляции: метод экземпляра подменяется оберткой
+            self.sim.update = self.profiler.wrap("physics", self.sim.update)
         self.push_to_toggle_keys = (
             arcade.key.KEY_1,
             arcade.key.KEY_2,
@@ -65,31 +153,64 @@ class ArcadeRenderer(arcade.Window):
             arcade.key.ESCAPE,
             arcade.key.SPACE,
             arcade.key.R,
+            arcade.key.P,
         )
         self.push_keys = (arcade.key.W, arcade.key.A, arcade.key.S, arcade.key.D)
+        self.seek_keys = {arcade.key.LEFT: -const.replay_seek, arcade.key.RIGHT: const.replay_seek}
 
-        self.land_sprite = arcade.SpriteList()
-        self.land_sprite.append(arcade.Sprite(load_image("land.png"), 1, center_x=0, center_y=0, angle=0))
+        self.startup_check = startup_check
+        self.first_frame_time = None
+        self.assets_time = None
 
-        self.dynamic_sprites = arcade.SpriteList()
-        self.dynamic_sprites.append(arcade.Sprite(load_image("aircraft.png"), 0.01, center_x=0, center_y=0, angle=0))
-        
-        self.missile_sprite =arcade.Sprite(load_image("missile.png"), 0.004, center_x=0, center_y=0, angle=0)
-        self.boom_sprite = arcade.Sprite(load_image("boom.png"), 0.012, center_x=0, center_y=0, angle=0)
+        # карта тайлами, если generator.py их создал, иначе одной картинкой land.png.
+        # Картинки декодируются в фоне, первый кадр рисуется без них
+        self.asset_loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="assets")
+        try:
+            tiles_path = os.path.dirname(load_image(os.path.join("tiles", "meta.json")))
+        except RuntimeError:
+            tiles_path = None
+        self.land_loading = None
+        if tiles_path is not None:
+            from land_tiles import TileMap
+
+            self.land_tiles = TileMap(tiles_path, (SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.land_sprite = self.land_tiles
+        else:
+            self.land_tiles = None
+            self.land_sprite = arcade.SpriteList()
+            self.land_loading = self.asset_loader.submit(load_texture, "land.png")
+
+        if compare:
+            missile_trails, missile_colors = self.sim.trajectory_missiles, LAW_COLORS
+        else:
+            missile_trails, missile_colors = [self.sim.trajectory_missile], [arcade.color.ORANGE_RED]
+        # самолет, ракеты и взрывы появляются, когда их картинки загрузятся (stream_assets)
+        self.body_sprites = None
+        self.missile_count = len(missile_trails)
+        self.sprites_loading = self.asset_loader.submit(
+            lambda: [load_texture(name) for name in ("aircraft.png", "missile.png", "boom.png")]
+        )
         
+        self.trail_renderer = TrailRenderer(
+            self.ctx,
+            [*missile_trails, self.sim.trajectory_aircraft],
+            [*missile_colors, arcade.color.WHITE_SMOKE],
+        )
+
         self.create_texts()
         self.text_delay = 0
 
     def update_camera(self):
         """Обновить положение камеры с учетом положения самолета"""
         self.camera.zoom = self.sim_scale
-        self.camera.position = (self.sim.airplane.x, self.sim.airplane.y)
-        up_vector = (self.sim.airplane.vx, self.sim.airplane.vy)
+        x, y, vx, vy = self.sim.interpolated(0)
+        self.camera.position = (x, y)
+        up_vector = (vx, vy)
         self.camera.up = up_vector
 
     def push_to_toggle(self, key, modifiers):
         """Обрабатывает кнопки с коротким нажатием (без длительности)"""        
-        if key in self.push_to_toggle_keys[:6]:
+        if key in self.push_to_toggle_keys[:6] and self.replay is None and not self.compare:
             number = self.push_to_toggle_keys.index(key) + 1
             self.sim.current_law = self.sim.laws[number]
             self.sim.reset()
@@ -99,6 +220,11 @@ class ArcadeRenderer(arcade.Window):
         elif key == arcade.key.R:
             self.sim.reset()
             self.sim.running = False
+            if self.replay is not None:
+                self.trail_renderer.invalidate()
+        elif key == arcade.key.P:
+            self.show_profile = not self.show_profile
+            self.profiler.enabled = self.show_profile or self.profiler.trace
         elif key == arcade.key.ESCAPE:
             self.close()
             
@@ -114,10 +240,11 @@ class ArcadeRenderer(arcade.Window):
         """Создание объектов текста"""
         text_size = pixel_norm(20)
         text_top_left = (
-            f"[1-6] Закон наведения: {self.sim.current_law.__name__}",
+            f"[1-6] Закон наведения: {self.law_title()}",
             "[Space] Старт / Пауза",
             "[W, A, S, D] Управление",
             "[R] Сброс",
+            "[P] Профилировщик",
             "[ESC] Выход",
         )
         text_dist_win = f"Расстояние до зоны победы: {math.floor(const.hypotenuse(self.sim.airplane.x, self.sim.airplane.y))}"
@@ -193,20 +320,64 @@ class ArcadeRenderer(arcade.Window):
             anchor_y="bottom",
             font_name="impact"
         )
+        text_profile = arcade.Text(
+            "",
+            pixel_norm(5),
+            pixel_norm(40),
+            arcade.color.WHITE,
+            text_size - 4,
+            width=int(pixel_norm(400)),
+            multiline=True,
+            anchor_x="left",
+            anchor_y="bottom",
+            font_name=("Consolas", "Courier New"),
+        )
         if not self.sim.win:
             text_game_over.text = "Цель перехвачена!"
             text_game_over.color = arcade.color.RED
 
         self.texts_hud = {'top_left': text_top_left, 'dist_win': text_dist_win, 'dist_missile': text_dist_missile, 'FPS': text_FPS, 'bot_right': text_bot_right}
         self.text_game_over = text_game_over
+        self.text_profile = text_profile
+
+        # итоги законов в режиме сравнения, каждый цветом своей траектории
+        self.texts_laws = [
+            arcade.Text(
+                "",
+                pixel_norm(5),
+                SCREEN_HEIGHT - pixel_norm(200 + 25 * i),
+                color,
+                text_size - 4,
+                anchor_x="left",
+                anchor_y="top",
+                font_name="impact"
+            )
+            for i, color in enumerate(LAW_COLORS[:len(self.sim.laws)] if self.compare else ())
+        ]
+
+    def law_title(self) -> str:
+        return "все (сравнение)" if self.compare else self.sim.current_law.__name__
+
+    def law_status(self, i: int) -> str:
+        """Итог ракеты i в режиме сравнения"""
+        sim = self.sim
+        name = sim.missiles[i].law.__name__
+        if sim.exploded[i]:
+            return f"{name}: попадание, {sim.hit_time[i]:.2f} с"
+        status = "промах" if sim.game_over else "летит"
+        return f"{name}: {status}, наименьшее расстояние {sim.miss_distances[i]:.1f}"
         
     def update_texts(self):
         self.texts_hud['top_left'].text = (
-            f"""[1-6] Закон наведения: {self.sim.current_law.__name__}\n[Space] Старт / Пауза\n[W, A, S, D] Управление\n[R] Сброс\n[ESC] Выход"""
+            f"""[1-6] Закон наведения: {self.law_title()}\n[Space] Старт / Пауза\n[W, A, S, D] Управление\n[R] Сброс\n[P] Профилировщик\n[ESC] Выход"""
         )
         self.texts_hud['dist_win'].text = f"Расстояние до зоны победы: {math.floor(const.hypotenuse(self.sim.airplane.x, self.sim.airplane.y))}"
         self.texts_hud['dist_missile'].text = f"Расстояние до ракеты: {math.floor(const.hypotenuse(self.sim.airplane.x - self.sim.missile.x, self.sim.airplane.y - self.sim.missile.y))}"
         self.texts_hud['FPS'].text = f'FPS: {math.floor(self.cur_FPS)}'
+        if self.show_profile:
+            self.text_profile.text = self.profiler.report()
+        for i, text in enumerate(self.texts_laws):
+            text.text = self.law_status(i)
     
     def draw_texts(self):
         """Отрисовка текста HUD."""
@@ -219,6 +390,10 @@ class ArcadeRenderer(arcade.Window):
         
         for t in self.texts_hud.values():
             t.draw()
+        for t in self.texts_laws:
+            t.draw()
+        if self.show_profile:
+            self.text_profile.draw()
         if self.sim.game_over:
             if not self.sim.win:
                 self.text_game_over.text = "Цель перехвачена!"
@@ -234,6 +409,9 @@ class ArcadeRenderer(arcade.Window):
             self.keys_pressed.add(key)
         elif key in self.push_to_toggle_keys:
             self.push_to_toggle(key, modifiers)
+        elif key in self.seek_keys and self.replay is not None:
+            self.replay.seek(self.replay.time + self.seek_keys[key])
+            self.trail_renderer.invalidate()
 
     def on_key_release(self, key, modifiers):
         """Обработка отпускания клавиш"""
@@ -243,54 +421,160 @@ class ArcadeRenderer(arcade.Window):
     def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
         """Обработка колесика мыши (scroll_y: вверх > 0, вниз < 0)"""
         if scroll_y > 0:
-            self.sim_scale = np.clip(self.sim_scale * 1.1, 1, 100)
+            self.sim_scale = min(self.sim_scale * 1.1, 100)
         elif scroll_y < 0:
-            self.sim_scale = np.clip(self.sim_scale * 0.9, 1, 100)
+            self.sim_scale = max(self.sim_scale * 0.9, 1)
     
+    def handle_input(self):
+        """Переводит зажатые клавиши W, A, S, D в управление самолетом"""
+        keys = self.keys_pressed
+        turn = (arcade.key.A in keys) - (arcade.key.D in keys)
+        throttle = (arcade.key.W in keys) - (arcade.key.S in keys)
+        self.sim.control(turn, throttle)
+
     def on_update(self, delta_time):
         "Обновление физики"
-        self.sim.handle_input(self.keys_pressed)
-        self.sim.update(delta_time)
+        if self.profiler.enabled and self.replay is None:
+            for missile in getattr(self.sim, "missiles", [self.sim.missile]):
+                if not hasattr(missile.law, "profiled"):
+                    # ракеты пересоздаются при сбросе, закон оборачивается заново
+                    missile.law = self.profiler.wrap("law", missile.law)
+        if getattr(self.sim, "script", None) is None:
+            self.handle_input()
+        self.sim.advance(delta_time)
+
+    def draw_bodies(self):
+        """Рисует самолет и ракеты одним SpriteList"""
+        self.body_sprites.update_airplane(0, *self.sim.interpolated(0))
+        if self.compare:
+            for i, exploded in enumerate(self.sim.exploded):
+                self.body_sprites.update_missile(i, *self.sim.interpolated(i + 1), exploded=exploded)
+        else:
+            self.body_sprites.update_missile(0, *self.sim.interpolated(1),
+                                             exploded=self.sim.game_over and not self.sim.win)
+        self.body_sprites.draw()
+
+    def stream_assets(self):
+        """Добавляет то, что успело загрузиться в фоне, и отмечает время полной загрузки"""
+        if self.land_loading is not None and self.land_loading.done():
+            texture = self.land_loading.result()
+            self.land_sprite.append(arcade.Sprite(texture, 1, center_x=0, center_y=0, angle=0))
+            self.land_loading = None
+        if self.sprites_loading is not None and self.sprites_loading.done():
+            self.body_sprites = BodySprites(*self.sprites_loading.result(), missiles=self.missile_count)
+            self.sprites_loading = None
+        if self.assets_time is not None or self.land_loading is not None or self.sprites_loading is not None:
+            return
+        self.asset_loader.shutdown(wait=False)
+        # тайлы карты заказываются в land_tiles.update, загрузка закончена, когда не осталось заказанных
+        if self.land_tiles is None or not self.land_tiles.pending:
+            self.assets_time = time.perf_counter() - START
+
+    def report_startup(self):
+        """Время до первого кадра и до полной загрузки, при --startup-check закрывает окно"""
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter() - START
+        if self.startup_check and self.assets_time is not None:
+            print(f"Первый кадр: {self.first_frame_time:.3f} с (бюджет {const.startup_budget} с), "
+                  f"все загружено: {self.assets_time:.3f} с")
+            self.close()
 
     def on_draw(self):
         """Главный цикл отрисовки."""
         frame_time = time.perf_counter() - self.last_frame
         self.last_frame = time.perf_counter()
         self.cur_FPS = 1 / frame_time
+        self.profiler.frame(frame_time)
         
         self.clear()
         self.update_camera()
 
         with self.camera.activate():
-            self.land_sprite.draw()
+            with self.profiler.section("land"):
+                if self.land_tiles is not None:
+                    self.land_tiles.update(*self.camera.position, self.sim_scale)
+                self.stream_assets()
+                self.land_sprite.draw()
 
             arcade.draw_circle_outline(0, 0, 5, arcade.color.GREEN, 1 / self.sim_scale, num_segments=64)
 
-            arcade.draw_line_strip(self.sim.trajectory_missile, arcade.color.ORANGE_RED)
-            arcade.draw_line_strip(self.sim.trajectory_aircraft, arcade.color.WHITE_SMOKE)
+            with self.profiler.section("trails"):
+                self.trail_renderer.draw()
 
-            self.dynamic_sprites[0].center_x = self.sim.airplane.x
-            self.dynamic_sprites[0].center_y = self.sim.airplane.y
-            self.dynamic_sprites[0].angle = 90 - math.degrees(math.atan2(self.sim.airplane.vy, self.sim.airplane.vx))
-            self.dynamic_sprites.draw()
-            
-            if self.sim.game_over and not self.sim.win:
-                self.current_missile_sprite = self.boom_sprite
-            else:
-                self.current_missile_sprite = self.missile_sprite
-            self.current_missile_sprite.center_x = self.sim.missile.x
-            self.current_missile_sprite.center_y = self.sim.missile.y
-            self.current_missile_sprite.angle = 90 - math.degrees(math.atan2 (self.sim.missile.vy, self.sim.missile.vx))
-            self.dynamic_sprites.append(self.current_missile_sprite)
-            self.dynamic_sprites.draw()
-            self.dynamic_sprites.pop()
-
-        self.draw_speed_gauge()
-        self.draw_texts()
+            with self.profiler.section("sprites"):
+                if self.body_sprites is not None:
+                    self.draw_bodies()
+
+        with self.profiler.section("hud"):
+            self.draw_speed_gauge()
+            self.draw_texts()
+        if self.first_frame_time is None or self.startup_check:
+            self.report_startup()
         
 def main():
-    window = ArcadeRenderer()
-    window.run()
+    parser = argparse.ArgumentParser(description="Симуляция перехвата самолета ракетой")
+    parser.add_argument("--record", metavar="DIR", help="записывать каждый шаг физики в папку DIR (recorder.py)")
+    parser.add_argument("--compression", choices=("zstd", "zlib"), help="сжатие записи")
+    parser.add_argument("--replay", metavar="FILE", help="воспроизвести запись, стрелки - перемотка")
+    parser.add_argument("--trace", metavar="FILE", help="замерять части кадра и сохранить трассу для chrome://tracing")
+    parser.add_argument("--startup-check", action="store_true",
+                        help="закрыться после загрузки, вывести время запуска, код 1 при превышении const.startup_budget")
+    parser.add_argument("--compare", action="store_true", help="все законы сразу, по ракете на закон")
+    parser.add_argument("--presets", metavar="FILE", help="N и t_norm по законам из autotune.py")
+    parser.add_argument("--script", metavar="FILE", help="самолет управляется сценарием из evasion.py вместо WASD")
+    args = parser.parse_args()
+    if args.compare and (args.replay or args.record):
+        parser.error("--compare нельзя совмещать с --record и --replay")
+    if args.script and args.replay:
+        parser.error("--script нельзя совмещать с --replay")
+
+    replay = recording = None
+    if args.replay or args.record:
+        import recorder
+    if args.replay:
+        try:
+            replay = recorder.Replay(recorder.Recording(args.replay))
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.record:
+        os.makedirs(args.record, exist_ok=True)
+        path = os.path.join(args.record, time.strftime("%Y%m%d_%H%M%S") + ".rec")
+        recording = recorder.Recorder(path, 2, 1 / const.physics_rate, args.compression)
+
+    try:
+        presets = simulation.load_presets(args.presets) if args.presets else None
+    except ValueError as e:
+        parser.error(str(e))
+    script, law = None, simulation.laws.PP
+    if args.script:
+        import headless
+        script = headless.Timeline.load(args.script)
+        if "dt" in script.info:
+            # сценарий, найденный с другим шагом, в окне дал бы другой перехват
+            try:
+                simulation.check_dt(script.info["dt"], f"Сценарий '{args.script}'")
+            except ValueError as e:
+                parser.error(str(e))
+        if "law" in script.info:
+            # закон и параметры, с которыми сценарий искался, чтобы перехват повторился точно
+            law = getattr(simulation.laws, script.info["law"])
+            presets = {**(presets or {}), script.info["law"]: (script.info["N"], script.info["t_norm"])}
+
+    init_screen()
+    window = ArcadeRenderer(replay, recording, trace=args.trace is not None, startup_check=args.startup_check,
+                            compare=args.compare, presets=presets, script=script, law=law)
+    try:
+        window.run()
+    finally:
+        window.asset_loader.shutdown(wait=False, cancel_futures=True)
+        if window.land_tiles is not None:
+            window.land_tiles.close()
+        if recording is not None:
+            recording.close()
+        if args.trace:
+            window.profiler.export(args.trace)
+    if args.startup_check and (window.first_frame_time is None or window.first_frame_time > const.startup_budget):
+        sys.exit(1)
     
 if __name__ == "__main__":
     main()
@@ -0,0 +1,221 @@
+"""Оценка вероятности поражения цели для каждого закона методом Монте-Карло.
+
+Начальные условия самолета и ракеты, навигационная постоянная N и сценарий
+уклонения самолета разыгрываются случайно. Перехваты считаются пакетами
+(headless.BatchSimulation) в ProcessPoolExecutor, как шум в parallel_generation.
+
+Каждый пакет получает свой генератор из SeedSequence(seed, spawn_key=(закон, номер пакета)),
+поэтому результат не зависит от числа процессов и порядка выполнения пакетов.
+Результаты пакетов сразу сворачиваются в Stats, поэтому память не растет с числом запусков.
+
+Пример:
+    python montecarlo.py --runs 100000 --laws TPN ZEMPN
+"""
+
+import argparse
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import sqrt
+from time import perf_counter
+from typing import NamedTuple
+
+import numpy as np
+
+import batch_laws
+import const
+import headless
+import laws as laws_module
+
+# Границы корзин гистограммы промахов (логарифмическая шкала)
+MISS_BINS = np.concatenate(([0.0], np.logspace(-1, 3, 41), [np.inf]))
+
+
+def worker_count(workers: int | None = None) -> int:
+    """Число процессов для пакетных расчетов: workers, по умолчанию os.cpu_count()"""
+    return max(1, workers or os.cpu_count() or 1)
+
+
+class Scenario(NamedTuple):
+    """Разброс начальных условий и параметры сценариев уклонения"""
+    airplane_spread: float = 200.0      # разброс начального положения самолета вокруг const.airplane_start
+    airplane_heading: float = 60.0      # разброс начального курса самолета, градусы
+    missile_spread: float = 50.0        # разброс положения ракеты вокруг const.missile_start
+    missile_heading: float = 30.0       # разброс курса ракеты, градусы
+    N_min: float = 2.0                  # диапазон навигационной постоянной
+    N_max: float = 5.0
+    segment: float = 2.0                # длительность отрезка сценария уклонения, с
+    straight: float = 0.2               # доля самолетов, летящих без маневров
+    dt: float = 1 / const.physics_rate  # шаг физики как в окне
+    t_max: float = 60.0
+
+
+class Stats:
+    """Накопленная статистика перехватов одного закона"""
+    def __init__(self):
+        self.runs = 0
+        self.hits = 0
+        self.wins = 0
+        self.hit_time = 0.0     # сумма времен перехвата
+        self.miss_hist = np.zeros(len(MISS_BINS) - 1, dtype=np.int64)
+
+    def add(self, outcome: "headless.BatchOutcome"):
+        self.runs += len(outcome.result)
+        hit = outcome.hit
+        self.hits += int(hit.sum())
+        self.wins += int((outcome.result == headless.WIN).sum())
+        self.hit_time += float(outcome.time[hit].sum())
+        self.miss_hist += np.histogram(outcome.miss_distance, MISS_BINS)[0]
+
+    def merge(self, other: "Stats"):
+        self.runs += other.runs
+        self.hits += other.hits
+        self.wins += other.wins
+        self.hit_time += other.hit_time
+        self.miss_hist += other.miss_hist
+
+    @property
+    def kill_probability(self) -> float:
+        return self.hits / self.runs if self.runs else 0.0
+
+    def confidence(self, z: float = 1.96) -> tuple[float, float]:
+        """Доверительный интервал Уилсона для вероятности поражения"""
+        if not self.runs:
+            return 0.0, 1.0
+        p, n = self.kill_probability, self.runs
+        center = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+        half = z * sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (1 + z**2 / n)
+        return center - half, center + half
+
+    @property
+    def mean_hit_time(self) -> float:
+        return self.hit_time / self.hits if self.hits else float("nan")
+
+
+def sample(rng: np.random.Generator, size: int, scenario: Scenario):
+    """Разыгрывает начальные условия, N и сценарии уклонения для пакета перехватов.
+
+    Returns:
+        tuple: airplane_start (size, 5), missile_start (size, 5), N (size,), headless.Schedule
+    """
+    def rotate(start, spread_xy, spread_heading):
+        start = np.tile(np.asarray(start, dtype=np.float64), (size, 1))
+        start[:, :2] += rng.uniform(-spread_xy, spread_xy, (size, 2))
+        angle = np.radians(rng.uniform(-spread_heading, spread_heading, size))
+        vx, vy = start[:, 2].copy(), start[:, 3].copy()
+        start[:, 2] = vx * np.cos(angle) - vy * np.sin(angle)
+        start[:, 3] = vx * np.sin(angle) + vy * np.cos(angle)
+        return start
+
+    airplane_start = rotate(const.airplane_start, scenario.airplane_spread, scenario.airplane_heading)
+    missile_start = rotate(const.missile_start, scenario.missile_spread, scenario.missile_heading)
+    N = rng.uniform(scenario.N_min, scenario.N_max, size)
+
+    segments = int(np.ceil(scenario.t_max / scenario.segment))
+    times = np.arange(segments) * scenario.segment
+    turn = rng.uniform(-1, 1, (size, segments))
+    throttle = rng.uniform(-1, 1, (size, segments))
+    straight = rng.random(size) < scenario.straight
+    turn[straight] = 0.0
+    throttle[straight] = 0.0
+    return airplane_start, missile_start, N, headless.Schedule(times, turn, throttle)
+
+
+def _chunk_worker(law_code: int, size: int, seed: int, chunk_index: int, scenario: Scenario) -> Stats:
+    """Считает один пакет перехватов и возвращает только его статистику"""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(law_code, chunk_index)))
+    airplane_start, missile_start, N, schedule = sample(rng, size, scenario)
+    sim = headless.BatchSimulation(law_code, N, airplane_start, missile_start)
+    stats = Stats()
+    stats.add(sim.run(schedule, scenario.dt, scenario.t_max))
+    return stats
+
+
+def estimate(
+    laws=batch_laws.SCALAR_LAWS,
+    runs: int = 100_000,
+    chunk: int = 4096,
+    seed: int = 0,
+    scenario: Scenario = Scenario(),
+    pool: ProcessPoolExecutor | None = None,
+    workers: int | None = None,
+    progress=None,
+) -> dict[str, Stats]:
+    """Оценивает вероятность поражения для каждого закона.
+
+    Args:
+        laws: законы наведения из laws.py
+        runs (int): число перехватов на закон
+        chunk (int): размер пакета, который считается одним векторным прогоном
+        seed (int): зерно генератора, результат детерминирован при одинаковых seed и chunk
+        scenario (Scenario): разброс начальных условий
+        pool (ProcessPoolExecutor | None): пул процессов, по умолчанию создается на workers процессов
+        workers (int | None): число процессов пула, по умолчанию os.cpu_count() (см. worker_count)
+        progress: функция progress(done_runs, total_runs), вызывается по мере готовности пакетов
+
+    Returns:
+        dict[str, Stats]: статистика по имени закона
+    """
+    workers = worker_count(workers)
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    # в работе держим не больше двух пакетов на процесс, чтобы не копить задания в памяти
+    max_pending = 2 * workers
+
+    codes = {law.__name__: batch_laws.SCALAR_LAWS.index(law) for law in laws}
+    tasks = (
+        (name, min(chunk, runs - start), i)
+        for name in codes
+        for i, start in enumerate(range(0, runs, chunk))
+    )
+    stats = {name: Stats() for name in codes}
+    total_runs = runs * len(codes)
+    pending = {}
+
+    def collect(futures):
+        for f in futures:
+            stats[pending.pop(f)].merge(f.result())
+        if progress is not None:
+            progress(sum(s.runs for s in stats.values()), total_runs)
+
+    try:
+        for name, size, i in tasks:
+            if len(pending) >= max_pending:
+                collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+            pending[pool.submit(_chunk_worker, codes[name], size, seed, i, scenario)] = name
+        collect(list(pending))
+    finally:
+        if own_pool:
+            pool.shutdown(cancel_futures=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вероятность поражения цели методом Монте-Карло")
+    parser.add_argument("--laws", nargs="*", default=[law.__name__ for law in batch_laws.SCALAR_LAWS])
+    parser.add_argument("--runs", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    start_time = perf_counter()
+
+    def progress(done, total):
+        elapsed = perf_counter() - start_time
+        print(f"\r{done}/{total} перехватов, {elapsed:.1f} с", end="", flush=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        stats = estimate(
+            [getattr(laws_module, name) for name in args.laws],
+            args.runs, args.chunk, args.seed, pool=pool, workers=args.workers, progress=progress,
+        )
+    print()
+    for name, s in stats.items():
+        low, high = s.confidence()
+        print(f"{name:8} Pk = {s.kill_probability:.4f} [{low:.4f}, {high:.4f}], "
+              f"среднее время перехвата {s.mean_hit_time:.2f} с, побед {s.wins}")
+
+
+if __name__ == "__main__":
+    main()
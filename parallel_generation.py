@@ -1,79 +1,255 @@
-from concurrent.futures import ProcessPoolExecutor, InterpreterPoolExecutor
-from noise import snoise2
+"""Параллельная генерация слоев карты по тайлам.
+
+Карта делится на много небольших тайлов, свободный воркер сразу берет следующий,
+поэтому все ядра заняты до конца независимо от их числа и неравномерной нагрузки.
+Тайлы пишутся прямо в общий SharedGrid, готовность собирается через as_completed.
+
+Работает и с ProcessPoolExecutor, и с InterpreterPoolExecutor. В субинтерпретаторах NumPy
+не загружается, поэтому там тайл считается по точкам модулем simplex_scalar (те же значения,
+но намного медленнее), а в SharedGrid пишется через memoryview. Поэтому модуль импортирует
+NumPy только внутри функций.
+"""
+
+import mmap
+import os
+from concurrent.futures import CancelledError, ProcessPoolExecutor, InterpreterPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from time import perf_counter
+
+import simplex_scalar
+
+# Сторона тайла, который воркер считает за одно задание
+TILE = 256
+
+_ITEMSIZE = 4   # float32
+
+
+class SharedGrid:
+    """Массив карты float32, в который воркеры пишут свои тайлы напрямую, без пересылки результата.
+
+    По умолчанию лежит в общей памяти (multiprocessing.shared_memory), с path - в файле .npy
+    (np.memmap), тогда карту можно открыть потом через np.load(path, mmap_mode="r").
+    В воркер передается только имя общей памяти или путь, массив открывается там заново.
+
+    Args:
+        shape (tuple[int, int]): форма карты (width, height)
+        path (str | None): файл .npy вместо общей памяти
+    """
+    def __init__(self, shape: tuple[int, int], path: str | None = None):
+        self.shape = tuple(shape)
+        self.path = path
+        self.name = None
+        self.offset = 0     # начало данных в файле .npy (после заголовка)
+        self._owner = True
+        self._shm = None
+        self._array = None
+        self._mmap = None
+        self._view = None
+        if path is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.size * _ITEMSIZE))
+            self.name = self._shm.name
+        else:
+            import numpy as np
+
+            self._array = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=self.shape)
+            self.offset = self._array.offset
+
+    @property
+    def size(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+    def __getstate__(self):
+        return self.shape, self.path, self.name, self.offset
+
+    def __setstate__(self, state):
+        self.shape, self.path, self.name, self.offset = state
+        self._owner = False
+        self._shm = None
+        self._array = None
+        self._mmap = None
+        self._view = None
+
+    def _attach(self):
+        # у открывающих чужую память процессов ее не должен удалять resource_tracker
+        self._shm = self._shm or shared_memory.SharedMemory(self.name, track=False)
+        return self._shm.buf
+
+    @property
+    def array(self) -> "np.ndarray":
+        """Массив (width, height) float32 поверх общей памяти или файла"""
+        import numpy as np
+
+        if self._array is None:
+            if self.path is not None:
+                self._array = np.load(self.path, mmap_mode="r+")
+            else:
+                self._array = np.ndarray(self.shape, dtype=np.float32, buffer=self._attach())
+        return self._array
+
+    def view(self) -> memoryview:
+        """Плоский memoryview float32 длины width * height, [i * height + j] - точка (i, j). Не требует NumPy"""
+        if self._view is None:
+            if self.path is not None:
+                with open(self.path, "r+b") as f:
+                    self._mmap = mmap.mmap(f.fileno(), 0)
+                buffer = memoryview(self._mmap)[self.offset:]
+            else:
+                buffer = self._attach()
+            self._view = buffer[:self.size * _ITEMSIZE].cast("f")
+        return self._view
+
+    def close(self):
+        """Отпускает массив, владелец еще и освобождает общую память. Ссылки на array после этого недействительны"""
+        if self._array is not None and hasattr(self._array, "flush"):
+            self._array.flush()
+        self._array = None
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 # =================== ГЛОБАЛЬНЫЕ ВОРКЕРЫ ===================
 
-def _noise_worker(i_start, i_end, height, scale, octaves, persistence, lacunarity, seed):
-    result = []
-    for i in range(i_start, i_end):
-        row = [
-            snoise2(i / scale, j / scale,
-                    octaves=octaves,
-                    persistence=persistence,
-                    lacunarity=lacunarity,
-                    repeatx=1024,
-                    repeaty=1024,
-                    base=seed)
-            for j in range(height)
-        ]
-        result.append(row)
-    return result
-
-
-def _color_worker(i_start, i_end, height, scale, intensity, seed):
-    result = []
+def _tile_numpy(out, i_start, i_end, j_start, j_end, scale, octaves, persistence, lacunarity, base, intensity):
+    import numpy as np
+    import simplex
+
+    i = np.arange(i_start, i_end)[:, np.newaxis] / scale
+    j = np.arange(j_start, j_end) / scale
+    block = simplex.snoise2(
+        i, j,
+        octaves=octaves,
+        persistence=persistence,
+        lacunarity=lacunarity,
+        repeatx=1024,
+        repeaty=1024,
+        base=base,
+    )
+    out[i_start:i_end, j_start:j_end] = block * intensity
+
+
+def _tile_scalar(out, height, i_start, i_end, j_start, j_end, scale, octaves, persistence, lacunarity, base, intensity):
+    # множитель округляется до float32 так же, как при умножении массива float32 на число в NumPy
+    intensity = simplex_scalar.f32(intensity)
     for i in range(i_start, i_end):
-        row = [
-            snoise2(i / scale, j / scale,
-                    octaves=1,
-                    persistence=0.5,
-                    lacunarity=2.0,
-                    repeatx=1024,
-                    repeaty=1024,
-                    base=seed + 1) * intensity
-            for j in range(height)
-        ]
-        result.append(row)
-    return result
+        row = i * height
+        for j in range(j_start, j_end):
+            value = simplex_scalar.snoise2(
+                i / scale, j / scale,
+                octaves=octaves,
+                persistence=persistence,
+                lacunarity=lacunarity,
+                repeatx=1024,
+                repeaty=1024,
+                base=base,
+            )
+            out[row + j] = value * intensity
+
+
+def _tile_worker(grid: SharedGrid, i_start, i_end, j_start, j_end, scale, octaves, persistence, lacunarity, base, intensity):
+    """Считает тайл [i_start:i_end, j_start:j_end] и пишет его в grid"""
+    try:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            # субинтерпретатор: NumPy не загружается
+            _tile_scalar(grid.view(), grid.shape[1], i_start, i_end, j_start, j_end,
+                         scale, octaves, persistence, lacunarity, base, intensity)
+        else:
+            _tile_numpy(grid.array, i_start, i_end, j_start, j_end,
+                        scale, octaves, persistence, lacunarity, base, intensity)
+    finally:
+        grid.close()
 
 # =================== ОСНОВНЫЕ ФУНКЦИИ ===================
 
-def vectorized_noise(width, height, scale, octaves, persistence, lacunarity, seed, pool: ProcessPoolExecutor | InterpreterPoolExecutor):
-    """ПОКА НЕ РАБОТАЕТ С СУБИНТЕРПРЕТАТОРАМИ"""
-    workers = 8
-    chunk_size = width // workers
-
-    futures = []
-    for i in range(workers):
-        i_start = i * chunk_size
-        i_end = (i + 1) * chunk_size if i < workers - 1 else width
-        f = pool.submit(
-            _noise_worker,
-            i_start, i_end, height, scale,
-            octaves, persistence, lacunarity, seed
-        )
-        futures.append(f)
-
-    print('waiting for workers (noise)...')
-    results = [f.result() for f in futures]
-    return [row for chunk in results for row in chunk]
-
-
-def vectorized_color(width, height, scale, intensity, seed, pool: ProcessPoolExecutor | InterpreterPoolExecutor):
-    """ПОКА НЕ РАБОТАЕТ С СУБИНТЕРПРЕТАТОРАМИ"""
-    workers = 8
-    chunk_size = width // workers
-
-    futures = []
-    for i in range(workers):
-        i_start = i * chunk_size
-        i_end = (i + 1) * chunk_size if i < workers - 1 else width
-        f = pool.submit(
-            _color_worker,
-            i_start, i_end, height, scale, intensity, seed
-        )
-        futures.append(f)
-
-    print('waiting for workers (color)...')
-    results = [f.result() for f in futures]
-    return [row for chunk in results for row in chunk]
\ No newline at end of file
+def tiles(width: int, height: int, tile: int = TILE):
+    """Границы тайлов карты (i_start, i_end, j_start, j_end) построчно"""
+    for i in range(0, width, tile):
+        for j in range(0, height, tile):
+            yield i, min(i + tile, width), j, min(j + tile, height)
+
+
+def generate(
+    out: SharedGrid,
+    scale, octaves, persistence, lacunarity, base, intensity=1.0,
+    pool: ProcessPoolExecutor | InterpreterPoolExecutor | None = None,
+    tile: int = TILE,
+    progress=None,
+    cancel=None,
+) -> SharedGrid:
+    """Заполняет out бесшовным шумом по тайлам.
+
+    Args:
+        out (SharedGrid): карта (width, height)
+        scale, octaves, persistence, lacunarity: параметры шума
+        base: сдвиг шума (seed)
+        intensity: множитель значений
+        pool: пул воркеров, по умолчанию ProcessPoolExecutor на os.cpu_count() процессов
+        tile (int): сторона тайла
+        progress: функция progress(done_tiles, total_tiles, eta), вызывается после каждого тайла,
+            eta - оценка оставшегося времени в секундах
+        cancel: threading.Event, при установке оставшиеся тайлы отменяются и бросается CancelledError
+
+    Returns:
+        SharedGrid: out
+    """
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    width, height = out.shape
+    futures = [
+        pool.submit(_tile_worker, out, *bounds, scale, octaves, persistence, lacunarity, base, intensity)
+        for bounds in tiles(width, height, tile)
+    ]
+    start_time = perf_counter()
+    try:
+        for done, f in enumerate(as_completed(futures), 1):
+            f.result()
+            if progress is not None:
+                elapsed = perf_counter() - start_time
+                progress(done, len(futures), elapsed / done * (len(futures) - done))
+            if cancel is not None and cancel.is_set():
+                raise CancelledError("Генерация карты отменена")
+    except BaseException:
+        # в том числе KeyboardInterrupt: уже запущенные тайлы небольшие и быстро закончатся
+        for f in futures:
+            f.cancel()
+        raise
+    finally:
+        if own_pool:
+            pool.shutdown(cancel_futures=True)
+    return out
+
+
+def vectorized_noise(width, height, scale, octaves, persistence, lacunarity, seed,
+                     pool: ProcessPoolExecutor | InterpreterPoolExecutor | None = None,
+                     out: SharedGrid | None = None, progress=None, cancel=None) -> SharedGrid:
+    """Карта высот. Возвращает out (или новый SharedGrid), закрыть его должен вызывающий"""
+    if out is None:
+        out = SharedGrid((width, height))
+    return generate(out, scale, octaves, persistence, lacunarity, seed,
+                    pool=pool, progress=progress, cancel=cancel)
+
+
+def vectorized_color(width, height, scale, intensity, seed,
+                     pool: ProcessPoolExecutor | InterpreterPoolExecutor | None = None,
+                     out: SharedGrid | None = None, progress=None, cancel=None) -> SharedGrid:
+    """Вариация цвета. Возвращает out (или новый SharedGrid), закрыть его должен вызывающий"""
+    if out is None:
+        out = SharedGrid((width, height))
+    return generate(out, scale, 1, 0.5, 2.0, seed + 1, intensity,
+                    pool=pool, progress=progress, cancel=cancel)
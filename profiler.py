@@ -0,0 +1,120 @@
+"""Замер времени частей кадра: скользящие перцентили и запись трассы для chrome://tracing.
+
+Участки кадра замеряются через section(name), отдельные функции (закон наведения,
+шаг физики) - через wrap(name, func), поэтому сами горячие функции не меняются.
+Время участка суммируется за кадр, frame() закрывает кадр и кладет суммы в кольцевой буфер
+последних const.profile_window кадров, по нему считаются p50 и p99.
+
+С trace=True каждый замер еще пишется событием трассы (формат Chrome Trace Event,
+открывается в chrome://tracing или ui.perfetto.dev), export(path) сохраняет трассу.
+
+Пример:
+    python main.py --trace trace.json    # [P] - показать разбивку кадра, трасса пишется при выходе
+"""
+
+import json
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter_ns
+
+import numpy as np
+
+import const
+
+
+class _Section:
+    """Контекстный менеджер замера одного участка"""
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, perf_counter_ns())
+
+
+class Profiler:
+    """Замеры времени по участкам кадра.
+
+    Args:
+        window (int): сколько последних кадров учитывать в перцентилях
+        trace (bool): писать события трассы для export
+        max_events (int): предел числа событий трассы, дальше новые события отбрасываются
+    """
+    def __init__(self, window: int = const.profile_window, trace: bool = False, max_events: int = 1_000_000):
+        self.window = window
+        self.enabled = trace
+        self.trace = trace
+        self.max_events = max_events
+        self.events = []
+        self.history = {}       # имя участка -> кольцевой буфер времени за кадр, нс
+        self.current = {}       # имя участка -> время за текущий кадр, нс
+        self.frames = 0
+        self.origin = perf_counter_ns()
+        self._null = nullcontext()
+
+    def section(self, name: str):
+        """Замер участка: with profiler.section("land"): ... Выключенный профилировщик ничего не делает"""
+        return _Section(self, name) if self.enabled else self._null
+
+    def wrap(self, name: str, func):
+        """Функция func, каждый вызов которой замеряется как участок name"""
+        @wraps(func)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, start, perf_counter_ns())
+        timed.profiled = name
+        return timed
+
+    def add(self, name: str, start: int, end: int):
+        """Добавляет замер участка name с start по end (perf_counter_ns)"""
+        self.current[name] = self.current.get(name, 0) + end - start
+        if self.trace and len(self.events) < self.max_events:
+            self.events.append({
+                "name": name, "ph": "X", "pid": 0, "tid": 0,
+                "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000,
+            })
+
+    def frame(self, frame_time: float):
+        """Закрывает кадр длительностью frame_time секунд"""
+        if not self.enabled:
+            return
+        self.current["frame"] = int(frame_time * 1e9)
+        slot = self.frames % self.window
+        for name in self.current.keys() | self.history.keys():
+            if name not in self.history:
+                self.history[name] = np.zeros(self.window, dtype=np.int64)
+            self.history[name][slot] = self.current.get(name, 0)
+        self.current.clear()
+        self.frames += 1
+
+    def percentiles(self, q=(50, 99)) -> dict[str, np.ndarray]:
+        """Перцентили q времени за кадр по участкам, мс. Участок "frame" - весь кадр"""
+        filled = min(self.frames, self.window)
+        if not filled:
+            return {}
+        return {name: np.percentile(values[:filled], q) / 1e6 for name, values in self.history.items()}
+
+    def report(self) -> str:
+        """Текст разбивки кадра: участок, p50 и p99 в мс"""
+        lines = [f"{'':10}{'p50':>8}{'p99':>8} мс"]
+        stats = self.percentiles()
+        for name in sorted(stats, key=lambda name: (name != "frame", -stats[name][0])):
+            p50, p99 = stats[name]
+            lines.append(f"{name:10}{p50:8.3f}{p99:8.3f}")
+        return "\n".join(lines)
+
+    def export(self, path: str):
+        """Сохраняет трассу в формате Chrome Trace Event"""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,317 @@
+"""Запись перехвата по шагам физики в компактный двоичный файл и воспроизведение записи.
+
+Формат файла (только дописывается, оборванная запись читается до последнего целого шага):
+- 8 байт сигнатуры MAGIC;
+- 4 байта длины и JSON-заголовок (число тел, шаг физики, сжатие, имена законов),
+  дополненный пробелами так, чтобы данные начинались с границы 64 байт;
+- без сжатия - подряд записи шагов с dtype record_dtype(bodies), такой файл
+  открывается через np.memmap без копирования (Recording.steps);
+- со сжатием - блоки: 4 байта длины сжатых данных, 4 байта числа шагов, данные
+  (zstd из compression.zstd в Python 3.14+ или zlib).
+
+Один шаг - время и состояние всех тел: x, y, vx, vy, командные an, at, индекс закона
+в batch_laws.SCALAR_LAWS (-1 у самолета) и флаги итога. Если в файл пишется несколько
+перехватов подряд (после сброса симуляции), время очередного начинается с нуля.
+
+Пример:
+    python main.py --record recordings     # записывать каждый перехват
+    python main.py --replay recordings/20250101_120000.rec   # воспроизвести, стрелки - перемотка
+"""
+
+import json
+import os
+import struct
+import zlib
+from math import hypot
+
+import numpy as np
+
+import batch_laws
+import const
+import trail
+
+try:
+    from compression import zstd as _zstd   # Python 3.14+
+except ImportError:
+    _zstd = None
+
+MAGIC = b"MSLREC\x00\x01"
+VERSION = 1
+ALIGN = 64
+
+# Флаги тела в записи шага
+ACTIVE, HIT, WIN = 1, 2, 4
+
+
+def record_dtype(bodies: int) -> np.dtype:
+    """Тип записи одного шага для bodies тел"""
+    fields = [("time", "<f8")]
+    fields += [(name, "<f4", (bodies,)) for name in ("x", "y", "vx", "vy", "an", "at")]
+    fields += [("law", "i1", (bodies,)), ("flags", "u1", (bodies,))]
+    return np.dtype(fields)
+
+
+def _compressor(compression: str | None):
+    if compression is None:
+        return None
+    if compression == "zstd":
+        if _zstd is None:
+            raise ValueError("zstd нужен Python 3.14+ (модуль compression.zstd)")
+        return _zstd.compress
+    if compression == "zlib":
+        return zlib.compress
+    raise ValueError(f"Неизвестное сжатие '{compression}', доступны: zstd, zlib")
+
+
+class Recorder:
+    """Дописывает шаги перехвата в файл.
+
+    Args:
+        path (str): файл записи
+        bodies (int): число тел в каждом шаге
+        dt (float): шаг физики
+        compression (str | None): None (файл читается через memmap), "zstd" или "zlib"
+        chunk (int): сколько шагов копится в памяти перед записью (и сжимается одним блоком)
+    """
+    def __init__(self, path: str, bodies: int, dt: float, compression: str | None = None, chunk: int = 4096):
+        self.path = path
+        self.dtype = record_dtype(bodies)
+        self.compress = _compressor(compression)
+        self._buffer = np.zeros(chunk, dtype=self.dtype)
+        self._filled = 0
+        self.steps = 0
+
+        header = json.dumps({
+            "version": VERSION,
+            "bodies": bodies,
+            "dt": dt,
+            "compression": compression,
+            "laws": [law.__name__ for law in batch_laws.SCALAR_LAWS],
+        }).encode()
+        padding = -(len(MAGIC) + 4 + len(header)) % ALIGN
+        header += b" " * padding
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    def append(self, time: float, x, y, vx, vy, an, at, law, flags):
+        """Дописывает шаг: время и массивы (bodies,) состояния тел"""
+        record = self._buffer[self._filled]
+        record["time"] = time
+        record["x"], record["y"], record["vx"], record["vy"] = x, y, vx, vy
+        record["an"], record["at"] = an, at
+        record["law"], record["flags"] = law, flags
+        self._filled += 1
+        self.steps += 1
+        if self._filled == len(self._buffer):
+            self.flush()
+
+    def record(self, sim):
+        """Дописывает шаг simulation.Simulation: тело 0 - самолет, 1 - ракета"""
+        airplane, missile = sim.airplane, sim.missile
+        hit = sim.game_over and not sim.win
+        self.append(
+            sim.time,
+            (airplane.x, missile.x), (airplane.y, missile.y),
+            (airplane.vx, missile.vx), (airplane.vy, missile.vy),
+            (airplane.an, missile.an), (airplane.at, missile.at),
+            (-1, batch_laws.SCALAR_LAWS.index(sim.current_law)),
+            (ACTIVE | (WIN if sim.win else 0), ACTIVE | (HIT if hit else 0)),
+        )
+
+    def flush(self):
+        if not self._filled:
+            return
+        data = self._buffer[:self._filled].tobytes()
+        if self.compress is None:
+            self._file.write(data)
+        else:
+            packed = self.compress(data)
+            self._file.write(struct.pack("<II", len(packed), self._filled))
+            self._file.write(packed)
+        self._file.flush()
+        self._filled = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """Запись, открытая для чтения.
+
+    steps - массив шагов с dtype record_dtype(bodies). Для файла без сжатия это np.memmap:
+    поля вида steps["x"][:, 1] (координата x ракеты по всем шагам) берутся без копирования.
+
+    Args:
+        path (str): файл записи
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"'{path}' - не файл записи перехвата")
+            (length,) = struct.unpack("<I", f.read(4))
+            self.header = json.loads(f.read(length))
+            offset = f.tell()
+            if self.header["version"] != VERSION:
+                raise ValueError(f"Неподдерживаемая версия записи {self.header['version']}")
+            self.dtype = record_dtype(self.header["bodies"])
+            self.dt = self.header["dt"]
+            self.laws = self.header["laws"]
+
+            compression = self.header["compression"]
+            if compression is None:
+                count = (os.path.getsize(path) - offset) // self.dtype.itemsize
+                self.steps = np.memmap(path, dtype=self.dtype, mode="r", offset=offset, shape=(count,)) \
+                    if count else np.zeros(0, dtype=self.dtype)
+            else:
+                decompress = _zstd.decompress if compression == "zstd" else zlib.decompress
+                chunks = []
+                while len(head := f.read(8)) == 8:
+                    size, count = struct.unpack("<II", head)
+                    packed = f.read(size)
+                    if len(packed) < size:
+                        break
+                    chunks.append(np.frombuffer(decompress(packed), dtype=self.dtype, count=count))
+                self.steps = np.concatenate(chunks) if chunks else np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def engagements(self) -> list[slice]:
+        """Границы перехватов в steps: новый перехват начинается, когда время не растет.
+        Сбросы без единого шага (перехват из одной начальной записи) пропускаются"""
+        time = self.steps["time"]
+        starts = np.flatnonzero(np.diff(time) <= 0) + 1
+        bounds = [0, *starts.tolist(), len(time)]
+        return [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b - a > 1]
+
+
+class _Body:
+    """Состояние тела в текущем шаге воспроизведения (для HUD)"""
+    def __init__(self):
+        self.x = self.y = self.vx = self.vy = self.current_speed = 0.0
+
+
+class Replay:
+    """Воспроизведение записанного перехвата вместо simulation.Simulation в main.ArcadeRenderer.
+
+    Повторяет используемую при отрисовке часть интерфейса Simulation (advance, interpolated,
+    airplane, missile, траектории, game_over, win) и умеет перематываться (seek).
+
+    Args:
+        recording (Recording): запись
+        engagement (int): номер перехвата в записи, по умолчанию последний.
+            Если в записи нет ни одного перехвата с шагами, воспроизводится вся запись
+    """
+    def __init__(self, recording: Recording, engagement: int = -1):
+        self.recording = recording
+        engagements = recording.engagements()
+        if engagements:
+            self.steps = recording.steps[engagements[engagement]]
+        elif len(recording):
+            self.steps = recording.steps
+        else:
+            raise ValueError(f"В записи '{recording.path}' нет ни одного шага")
+        self.dt = recording.dt
+        self.current_fps = const.FPS
+        self.laws = {}
+        self.airplane, self.missile = _Body(), _Body()
+        self.trajectory_aircraft = trail.Trail()
+        self.trajectory_missile = trail.Trail()
+        # траектории пишутся с частотой отрисовки, как в Simulation: шаг 0 - состояние после сброса,
+        # первая точка - после первого шага физики, дальше каждые record_every шагов
+        self.record_every = max(1, round(1 / (const.FPS * self.dt)))
+        self.position = 0.0
+        self.running = False
+        self.paused = False
+        self.seek(0.0)
+
+    @property
+    def duration(self) -> float:
+        return float(self.steps["time"][-1]) if len(self.steps) else 0.0
+
+    @property
+    def time(self) -> float:
+        return self.position * self.dt
+
+    @property
+    def current_law(self):
+        return batch_laws.SCALAR_LAWS[int(self.steps["law"][0, 1])]
+
+    @property
+    def step(self) -> int:
+        return min(int(self.position), len(self.steps) - 1)
+
+    @property
+    def game_over(self) -> bool:
+        return self.step == len(self.steps) - 1 and bool((self.steps["flags"][-1] & (HIT | WIN)).any())
+
+    @property
+    def win(self) -> bool:
+        return self.game_over and bool(self.steps["flags"][-1, 0] & WIN)
+
+    def _records(self, i: int) -> bool:
+        """Пишет ли Simulation точку траектории после шага i"""
+        return i >= 1 and (i - 1) % self.record_every == 0
+
+    def _trail_point(self, i: int):
+        s = self.steps[i]
+        speed = hypot(s["vx"][0], s["vy"][0]) or 1.0
+        self.trajectory_aircraft.append(
+            s["x"][0] - s["vx"][0] * (const.move_trajectory / speed),
+            s["y"][0] - s["vy"][0] * (const.move_trajectory / speed),
+        )
+        self.trajectory_missile.append(s["x"][1], s["y"][1])
+
+    def _update_bodies(self):
+        s = self.steps[self.step]
+        for i, body in enumerate((self.airplane, self.missile)):
+            body.x, body.y, body.vx, body.vy = (float(s[k][i]) for k in ("x", "y", "vx", "vy"))
+            body.current_speed = hypot(body.vx, body.vy)
+
+    def seek(self, t: float):
+        """Переходит к моменту t, траектории перестраиваются по записи"""
+        self.position = min(max(t / self.dt, 0.0), max(len(self.steps) - 1, 0))
+        self.trajectory_aircraft.clear()
+        self.trajectory_missile.clear()
+        last = self.step - (self.step - 1) % self.record_every
+        first = max(1, last - (self.trajectory_aircraft.length - 1) * self.record_every)
+        for i in range(first, last + 1, self.record_every):
+            self._trail_point(i)
+        self._update_bodies()
+
+    def reset(self):
+        self.seek(0.0)
+        self.running = False
+
+    def control(self, turn: float, throttle: float):
+        """Запись не управляется"""
+
+    def advance(self, frame_dt: float) -> int:
+        """Продвигает воспроизведение на время кадра, возвращает число пройденных шагов"""
+        if not self.running or self.paused or not len(self.steps):
+            return 0
+        before = self.step
+        self.position = min(self.position + frame_dt / self.dt, len(self.steps) - 1)
+        for i in range(before + 1, self.step + 1):
+            if self._records(i):
+                self._trail_point(i)
+        self._update_bodies()
+        return self.step - before
+
+    def interpolated(self, i: int) -> tuple[float, float, float, float]:
+        """Положение и скорость тела i (0 - самолет, 1 - ракета) между соседними записанными шагами"""
+        step = self.step
+        nxt = min(step + 1, len(self.steps) - 1)
+        alpha = self.position - step
+        a, b = self.steps[step], self.steps[nxt]
+        return tuple(float(a[k][i] + (b[k][i] - a[k][i]) * alpha) for k in ("x", "y", "vx", "vy"))
@@ -0,0 +1,272 @@
+"""Залп: K ракет против одного или нескольких самолетов в одной сцене.
+
+У каждой ракеты свой закон наведения, своя навигационная постоянная и своя цель.
+Все тела лежат в одном BodyArray, шаг физики - векторный (BodyArray.calc_move).
+Поражение ищется по всему шагу, как в Simulation.update, но только для пар ракета-самолет,
+которые могли сблизиться за шаг: кандидатов дает collision.SpatialHash, а не перебор всех пар.
+
+Ракета, попавшая в любой самолет, выбывает вместе с ним. Ракета, чья цель выбыла
+(сбита или долетела до зоны победы), перенацеливается на ближайший оставшийся самолет.
+
+Пример:
+    python salvo.py --missiles 300 --aircraft 3 --laws TPN ZEMPN PP
+"""
+
+import argparse
+from time import perf_counter
+from typing import NamedTuple
+
+import numpy as np
+
+import bodies
+import collision
+import const
+import laws as laws_module
+from headless import HIT, RESULTS, TIMEOUT, WIN
+
+
+class SalvoOutcome(NamedTuple):
+    """Итог залпа"""
+    result: np.ndarray          # (M,) код итога для каждого самолета: TIMEOUT, HIT или WIN
+    time: np.ndarray            # (M,) время поражения или победы, иначе время окончания
+    killer: np.ndarray          # (M,) индекс ракеты, сбившей самолет, или -1
+    hit_target: np.ndarray      # (K,) индекс самолета, в который попала ракета, или -1
+    miss_distance: np.ndarray   # (K,) минимальное расстояние ракеты до своей текущей цели
+    steps: int
+
+
+class Salvo:
+    """Сцена с K ракетами и M самолетами.
+
+    Args:
+        airplane_start: массив (M, 5) начальных условий самолетов
+        missile_start: массив (K, 5) начальных условий ракет
+        law: закон наведения для всех ракет, список (K,) законов или массив индексов в batch_laws.LAWS
+        N: навигационная постоянная или массив (K,)
+        target: массив (K,) индексов целей (0..M-1), по умолчанию ракеты распределяются по самолетам по кругу
+    """
+    def __init__(self, airplane_start, missile_start, law=laws_module.TPN, N=const.N, target=None):
+        self.airplane_start = np.asarray(airplane_start, dtype=np.float64).reshape(-1, 5)
+        self.missile_start = np.asarray(missile_start, dtype=np.float64).reshape(-1, 5)
+        k, m = len(self.missile_start), len(self.airplane_start)
+        if callable(law):
+            law = bodies.law_index(law)
+        elif not isinstance(law, np.ndarray):
+            law = np.array([bodies.law_index(item) for item in law], dtype=np.int8)
+        self.law = law
+        self.N = N
+        self.target = np.arange(k) % m if target is None else np.asarray(target, dtype=np.intp)
+        self.reset()
+
+    def reset(self):
+        k, m = len(self.missile_start), len(self.airplane_start)
+        self.store = bodies.BodyArray(k + m)
+        self.planes = self.store.add_airplanes(self.airplane_start)
+        self.missiles = self.store.add_missiles(self.missile_start, self.law, self.planes[self.target], self.N)
+        self.time = 0.0
+        self.steps = 0
+        self.result = np.full(m, TIMEOUT, dtype=np.int8)
+        self.end_time = np.zeros(m)
+        self.killer = np.full(m, -1, dtype=np.intp)
+        self.hit_target = np.full(k, -1, dtype=np.intp)
+        self.miss_distance = self.distance()
+        self.game_over = False
+
+    @property
+    def planes_left(self) -> np.ndarray:
+        return self.store.active[self.planes]
+
+    @property
+    def missiles_left(self) -> np.ndarray:
+        return self.store.active[self.missiles]
+
+    def distance(self) -> np.ndarray:
+        """Расстояния ракет до их текущих целей"""
+        s = self.store
+        targets = s.target[self.missiles]
+        return np.hypot(s.x[self.missiles] - s.x[targets], s.y[self.missiles] - s.y[targets])
+
+    def control(self, turn, throttle):
+        """Управление самолетами, как в Simulation.control: числа или массивы (M,)"""
+        s = self.store
+        speed = s.current_speed[self.planes]
+        turn, throttle = np.asarray(turn, dtype=np.float64), np.asarray(throttle, dtype=np.float64)
+        s.an[self.planes] = turn * const.acceleration_n * np.abs(speed / const.airplane_max_speed)
+        s.at[self.planes] = np.where(
+            throttle > 0, throttle * const.acceleration_t / 2, throttle * const.acceleration_t
+        )
+
+    def update(self, dt):
+        if self.game_over:
+            return
+        s = self.store
+        planes = self.planes[self.planes_left]
+        missiles = self.missiles[self.missiles_left]
+        # положения и скорости в начале шага для поиска столкновений по всему шагу
+        px, py, pvx, pvy = s.x[planes], s.y[planes], s.vx[planes], s.vy[planes]
+        mx, my, mvx, mvy = s.x[missiles], s.y[missiles], s.vx[missiles], s.vy[missiles]
+        targets = s.target[missiles]
+        tx, ty, tvx, tvy = s.x[targets], s.y[targets], s.vx[targets], s.vy[targets]
+
+        s.calc_move(dt)
+
+        # промах до своей цели - по всему шагу, как в Simulation
+        plane_ids = planes - self.planes[0]
+        missile_ids = missiles - self.missiles[0]
+        own_motion = (mx - tx, my - ty, mvx - tvx, mvy - tvy,
+                      s.ax[missiles] - s.ax[targets], s.ay[missiles] - s.ay[targets])
+        _, own_distance = collision.closest_approach(*own_motion, dt)
+        self.miss_distance[missile_ids] = np.minimum(self.miss_distance[missile_ids], own_distance)
+
+        # пары ракета-самолет, которые за шаг могли сблизиться на plane_size
+        cell = const.plane_size + collision.reach(pvx, pvy, s.ax[planes], s.ay[planes], dt) \
+            + collision.reach(mvx, mvy, s.ax[missiles], s.ay[missiles], dt)
+        index = collision.SpatialHash(cell)
+        index.build(px, py)
+        m_i, p_i = index.query(mx, my)
+        close = np.hypot(mx[m_i] - px[p_i], my[m_i] - py[p_i]) < cell
+        m_i, p_i = m_i[close], p_i[close]
+
+        t_hit = np.full(len(missiles), np.inf)
+        hit_plane = np.full(len(missiles), -1, dtype=np.intp)
+        if m_i.size:
+            motion = (mx[m_i] - px[p_i], my[m_i] - py[p_i], mvx[m_i] - pvx[p_i], mvy[m_i] - pvy[p_i],
+                      s.ax[missiles[m_i]] - s.ax[planes[p_i]], s.ay[missiles[m_i]] - s.ay[planes[p_i]])
+            t, d = collision.closest_approach(*motion, dt)
+            inside = d < const.plane_size
+            if inside.any():
+                motion = tuple(a[inside] for a in motion)
+                t_pair = collision.entry_time(*motion, t[inside], const.plane_size)
+                m_i, p_i = m_i[inside], p_i[inside]
+                # ракета взрывается у первого самолета, к которому подлетела
+                order = np.lexsort((t_pair, m_i))
+                first = np.ones(order.size, dtype=bool)
+                first[1:] = m_i[order][1:] != m_i[order][:-1]
+                order = order[first]
+                t_hit[m_i[order]] = t_pair[order]
+                hit_plane[m_i[order]] = p_i[order]
+
+        # зона победы - только для самолетов, их немного
+        win_motion = (px, py, pvx, pvy, s.ax[planes], s.ay[planes])
+        t_closest, win_distance = collision.closest_approach(*win_motion, dt)
+        t_win = np.full(len(planes), np.inf)
+        win = win_distance < const.win_zone_r
+        if win.any():
+            t_win[win] = collision.entry_time(*(a[win] for a in win_motion), t_closest[win], const.win_zone_r)
+
+        # самолет сбит, если первая ракета долетела до него раньше, чем он до зоны победы
+        plane_hit_time = np.full(len(planes), np.inf)
+        np.minimum.at(plane_hit_time, hit_plane[hit_plane >= 0], t_hit[hit_plane >= 0])
+        shot = plane_hit_time < np.inf
+        shot &= plane_hit_time <= t_win
+        escaped = (t_win < np.inf) & ~shot
+        exploded = (hit_plane >= 0) & (t_hit <= t_win[np.maximum(hit_plane, 0)])
+        exploded &= shot[np.maximum(hit_plane, 0)]
+
+        self.result[plane_ids[shot]] = HIT
+        self.result[plane_ids[escaped]] = WIN
+        self.end_time[plane_ids[shot]] = self.time + plane_hit_time[shot]
+        self.end_time[plane_ids[escaped]] = self.time + t_win[escaped]
+        self.hit_target[missile_ids[exploded]] = plane_ids[hit_plane[exploded]]
+        for p in np.flatnonzero(shot):
+            first = np.flatnonzero(exploded & (hit_plane == p))
+            self.killer[plane_ids[p]] = missile_ids[first[np.argmin(t_hit[first])]]
+        s.active[planes[shot | escaped]] = False
+        s.active[missiles[exploded]] = False
+
+        self.time += dt
+        self.steps += 1
+        if shot.any() or escaped.any():
+            self.retarget()
+        self.game_over = not self.planes_left.any() or not self.missiles_left.any()
+
+    def retarget(self):
+        """Ракеты, чья цель выбыла, наводятся на ближайший оставшийся самолет"""
+        s = self.store
+        alive = self.planes[self.planes_left]
+        lost = self.missiles[self.missiles_left & ~s.active[s.target[self.missiles]]]
+        if lost.size == 0:
+            return
+        if alive.size == 0:
+            s.active[lost] = False
+            return
+        d2 = (s.x[lost, None] - s.x[alive]) ** 2 + (s.y[lost, None] - s.y[alive]) ** 2
+        s.target[lost] = alive[np.argmin(d2, axis=1)]
+        self.miss_distance[lost - self.missiles[0]] = np.sqrt(d2.min(axis=1))
+
+    def run(self, controls=None, dt: float = 1 / const.physics_rate, t_max: float = 120.0) -> SalvoOutcome:
+        """Шагает сцену до окончания или до t_max.
+
+        Args:
+            controls: функция policy(t, salvo) -> (turn, throttle), числа или массивы (M,).
+                None - самолеты летят прямо
+            dt (float): фиксированный шаг физики
+            t_max (float): предельное время
+
+        Returns:
+            SalvoOutcome: итог залпа
+        """
+        while not self.game_over and self.time < t_max:
+            if controls is not None:
+                self.control(*controls(self.time, self))
+            self.update(dt)
+        end_time = np.where(self.result != TIMEOUT, self.end_time, self.time)
+        return SalvoOutcome(self.result.copy(), end_time, self.killer.copy(), self.hit_target.copy(),
+                            self.miss_distance.copy(), self.steps)
+
+
+def spread_starts(count: int, start, spread: float, rng: np.random.Generator, aim=None) -> np.ndarray:
+    """Начальные условия count тел, разбросанных на spread вокруг start.
+
+    Args:
+        count (int): число тел
+        start: начальные условия x, y, vx, vy, air_drag (как const.missile_start)
+        spread (float): разброс положения по каждой оси
+        rng (np.random.Generator): генератор случайных чисел
+        aim: массив (count, 2) точек, на которые направлена скорость, None - скорость как в start
+
+    Returns:
+        np.ndarray: массив (count, 5)
+    """
+    starts = np.tile(np.asarray(start, dtype=np.float64), (count, 1))
+    starts[:, :2] += rng.uniform(-spread, spread, (count, 2))
+    if aim is not None:
+        speed = np.hypot(starts[:, 2], starts[:, 3])
+        heading = np.arctan2(aim[:, 1] - starts[:, 1], aim[:, 0] - starts[:, 0])
+        starts[:, 2] = speed * np.cos(heading)
+        starts[:, 3] = speed * np.sin(heading)
+    return starts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Залп ракет по нескольким самолетам")
+    parser.add_argument("--missiles", type=int, default=100)
+    parser.add_argument("--aircraft", type=int, default=3)
+    parser.add_argument("--laws", nargs="*", default=["TPN"], help="законы ракет по кругу")
+    parser.add_argument("--N", type=float, default=const.N)
+    parser.add_argument("--spread", type=float, default=200.0, help="разброс положений самолетов и ракет")
+    parser.add_argument("--dt", type=float, default=1 / const.physics_rate)
+    parser.add_argument("--t-max", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    airplane_start = spread_starts(args.aircraft, const.airplane_start, args.spread, rng)
+    target = np.arange(args.missiles) % args.aircraft
+    missile_start = spread_starts(args.missiles, const.missile_start, args.spread, rng, airplane_start[target, :2])
+    law = [getattr(laws_module, args.laws[i % len(args.laws)]) for i in range(args.missiles)]
+
+    salvo = Salvo(airplane_start, missile_start, law, args.N, target)
+    start_time = perf_counter()
+    outcome = salvo.run(dt=args.dt, t_max=args.t_max)
+    elapsed = perf_counter() - start_time
+
+    for i, (result, t, killer) in enumerate(zip(outcome.result, outcome.time, outcome.killer)):
+        by = f", ракета {killer} ({law[killer].__name__})" if killer >= 0 else ""
+        print(f"самолет {i}: {RESULTS[result]} за {t:.2f} с{by}")
+    print(f"попаданий {int((outcome.hit_target >= 0).sum())} из {args.missiles} ракет, "
+          f"{outcome.steps} шагов за {elapsed:.2f} с ({outcome.steps / max(elapsed, const.eps):.0f} шагов/с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Симплексный шум на NumPy, совместимый с noise.snoise2 (библиотека noise 1.2.2).
+
+Шум считается сразу для целого массива координат, все октавы - в одном вызове.
+Вычисления повторяют C-реализацию noise шаг за шагом в float32,
+поэтому при тех же octaves / persistence / lacunarity / repeatx / repeaty / base
+получаются те же значения, что и у snoise2, и старые seed дают те же карты.
+"""
+
+import numpy as np
+
+import simplex_scalar
+
+f32 = np.float32
+
+_PERM = np.array(simplex_scalar.PERM, dtype=np.intp)
+_GRAD3 = np.array(simplex_scalar.GRAD3, dtype=np.float32)
+_GRAD4 = np.array(simplex_scalar.GRAD4, dtype=np.float32)
+_SIMPLEX = np.array(simplex_scalar.SIMPLEX, dtype=np.int8)
+
+# 2D
+_F2 = f32(0.3660254037844386)   # 0.5 * (sqrt(3.0) - 1.0)
+_G2 = f32(0.21132486540518713)  # (3.0 - sqrt(3.0)) / 6.0
+# 4D
+_F4 = f32(0.30901699437494745)  # (sqrt(5.0) - 1.0) / 4.0
+_G4 = f32(0.1381966011250105)   # (5.0 - sqrt(5.0)) / 20.0
+
+# Для каждого номера симплекса: сдвиги вершин 1-3 по каждой оси (SIMPLEX[c][axis] >= 3, 2, 1)
+_SIMPLEX_STEPS = [(_SIMPLEX >= level).astype(np.float32) for level in (3, 2, 1)]
+
+
+def _noise2(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """noise2 из _simplex.c для массивов float32"""
+    s = (x + y) * _F2
+    i = np.floor(x + s)
+    j = np.floor(y + s)
+    t = (i + j) * _G2
+
+    x0 = x - (i - t)
+    y0 = y - (j - t)
+    i1 = (x0 > y0).astype(np.float32)
+    j1 = (x0 <= y0).astype(np.float32)
+
+    corners = (
+        (x0, y0),
+        (x0 - i1 + _G2, y0 - j1 + _G2),
+        (x0 + _G2 * f32(2.0) - f32(1.0), y0 + _G2 * f32(2.0) - f32(1.0)),
+    )
+    I = i.astype(np.int32) & 255
+    J = j.astype(np.int32) & 255
+    i1, j1 = i1.astype(np.intp), j1.astype(np.intp)
+    gradients = (
+        _PERM[I + _PERM[J]] % 12,
+        _PERM[I + i1 + _PERM[J + j1]] % 12,
+        _PERM[I + 1 + _PERM[J + 1]] % 12,
+    )
+
+    total = np.zeros_like(x)
+    for (xc, yc), g in zip(corners, gradients):
+        f = f32(0.5) - xc * xc - yc * yc
+        n = f * f * f * f * (_GRAD3[g, 0] * xc + _GRAD3[g, 1] * yc)
+        total = total + np.where(f > 0, n, f32(0.0))
+    return total * f32(70.0)
+
+
+def _noise4(x: np.ndarray, y: np.ndarray, z: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """noise4 из _simplex.c для массивов float32"""
+    s = (x + y + z + w) * _F4
+    i = np.floor(x + s)
+    j = np.floor(y + s)
+    k = np.floor(z + s)
+    l = np.floor(w + s)
+    t = (i + j + k + l) * _G4
+
+    x0 = x - (i - t)
+    y0 = y - (j - t)
+    z0 = z - (k - t)
+    w0 = w - (l - t)
+
+    c = ((x0 > y0) * 32 + (x0 > z0) * 16 + (y0 > z0) * 8
+         + (x0 > w0) * 4 + (y0 > w0) * 2 + (z0 > w0) * 1)
+
+    I = i.astype(np.int32) & 255
+    J = j.astype(np.int32) & 255
+    K = k.astype(np.int32) & 255
+    L = l.astype(np.int32) & 255
+
+    total = np.zeros_like(x)
+    # вершины 0 и 4 - без сдвига и со сдвигом на 1 по всем осям, 1-3 - по таблице SIMPLEX
+    for vertex in range(5):
+        if vertex == 0:
+            offsets = None
+            xc, yc, zc, wc = x0, y0, z0, w0
+        elif vertex == 4:
+            offsets = (1, 1, 1, 1)
+            g4 = f32(4.0) * _G4
+            xc, yc, zc, wc = (x0 - f32(1.0) + g4, y0 - f32(1.0) + g4, z0 - f32(1.0) + g4, w0 - f32(1.0) + g4)
+        else:
+            steps = _SIMPLEX_STEPS[vertex - 1][c]
+            offsets = tuple(steps[:, axis].astype(np.intp) for axis in range(4))
+            g = f32(vertex) * _G4 if vertex > 1 else _G4
+            xc, yc, zc, wc = (x0 - steps[:, 0] + g, y0 - steps[:, 1] + g,
+                              z0 - steps[:, 2] + g, w0 - steps[:, 3] + g)
+
+        if offsets is None:
+            gi = _PERM[I + _PERM[J + _PERM[K + _PERM[L]]]] & 0x1f
+        else:
+            oi, oj, ok, ol = offsets
+            gi = _PERM[I + oi + _PERM[J + oj + _PERM[K + ok + _PERM[L + ol]]]] & 0x1f
+
+        tc = f32(0.6) - xc * xc - yc * yc - zc * zc - wc * wc
+        tc2 = tc * tc
+        grad = _GRAD4[gi]
+        n = tc2 * tc2 * (grad[:, 0] * xc + grad[:, 1] * yc + grad[:, 2] * zc + grad[:, 3] * wc)
+        total = total + np.where(tc >= 0, n, f32(0.0))
+    return f32(27.0) * total
+
+
+def _fast_sin(x: np.ndarray) -> np.ndarray:
+    """fast_sin из _noise.h: аргумент в полупериодах (x = 2 - полный оборот)"""
+    z = x + f32(25165824.0)
+    x = x - (z - f32(25165824.0))
+    y = x - x * np.abs(x)
+    return y * (f32(3.1) + f32(3.6) * np.abs(y))
+
+
+def _fbm(noise, coords, octaves: int, persistence: float, lacunarity: float) -> np.ndarray:
+    """Сумма октав с нормировкой на сумму амплитуд, как в fbm_noise4"""
+    persistence, lacunarity = f32(persistence), f32(lacunarity)
+    freq, amp, max_amp = f32(1.0), f32(1.0), f32(1.0)
+    total = noise(*coords)
+    for _ in range(1, octaves):
+        freq *= lacunarity
+        amp *= persistence
+        max_amp += amp
+        total = total + noise(*(c * freq for c in coords)) * amp
+    return total / max_amp
+
+
+def snoise2(x, y, octaves: int = 1, persistence: float = 0.5, lacunarity: float = 2.0,
+            repeatx: float | None = None, repeaty: float | None = None, base: float = 0.0) -> np.ndarray:
+    """Векторный аналог noise.snoise2 для массивов координат.
+
+    Args:
+        x, y: координаты (массивы одной формы или числа), приводятся к float32 как в C
+        octaves (int): число октав
+        persistence (float): множитель амплитуды каждой следующей октавы
+        lacunarity (float): множитель частоты каждой следующей октавы
+        repeatx, repeaty: период повторения шума по осям (оба или ни одного)
+        base (float): сдвиг шума, задает seed
+
+    Returns:
+        np.ndarray: значения шума float32 той же формы, что и x, y
+    """
+    if octaves <= 0:
+        raise ValueError("Expected octaves value > 0")
+    x = np.asarray(x, dtype=np.float64).astype(np.float32)
+    y = np.asarray(y, dtype=np.float64).astype(np.float32)
+    x, y = np.broadcast_arrays(x, y)
+    shape = x.shape
+    x, y = x.ravel(), y.ravel()
+    z = np.full_like(x, f32(base))
+
+    if repeatx is None and repeaty is None:
+        # плоский шум: сдвиг base добавляется после умножения на частоту
+        persistence, lacunarity = f32(persistence), f32(lacunarity)
+        freq, amp, max_amp = f32(1.0), f32(1.0), f32(1.0)
+        total = _noise2(x + z, y + z)
+        for _ in range(1, octaves):
+            freq *= lacunarity
+            amp *= persistence
+            max_amp += amp
+            total = total + _noise2(x * freq + z, y * freq + z) * amp
+        return (total / max_amp).reshape(shape)
+    if repeatx is None or repeaty is None:
+        raise NotImplementedError("Повторение только по одной оси не поддерживается")
+
+    # бесшовный шум: каждая ось сворачивается в окружность, шум берется в 4D
+    w = z.copy()
+    yf = (y.astype(np.float64) * 2.0 / repeaty).astype(np.float32)
+    yr = f32(repeaty * (1 / np.pi) * 0.5)
+    vy = _fast_sin(yf)
+    vyz = _fast_sin(yf + f32(0.5))
+    y = vy * yr
+    w = w + vyz * yr
+
+    xf = (x.astype(np.float64) * 2.0 / repeatx).astype(np.float32)
+    xr = f32(repeatx * (1 / np.pi) * 0.5)
+    vx = _fast_sin(xf)
+    vxz = _fast_sin(xf + f32(0.5))
+    x = vx * xr
+    z = z + vxz * xr
+    return _fbm(_noise4, (x, y, z, w), octaves, persistence, lacunarity).reshape(shape)
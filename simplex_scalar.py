@@ -0,0 +1,200 @@
+"""Симплексный шум на чистом Python, те же значения, что у simplex.snoise2 и noise.snoise2.
+
+Нужен там, где нельзя загрузить NumPy и C-расширения: в субинтерпретаторах
+(InterpreterPoolExecutor). Каждая операция округляется до float32, как в C-реализации,
+поэтому результат совпадает бит в бит, но считается в сотни раз медленнее векторной версии.
+Модуль не импортирует ничего, кроме стандартной библиотеки; таблицы отсюда использует и simplex.py.
+"""
+
+import struct
+from math import floor, pi
+
+_float32 = struct.Struct("f")
+
+
+def f32(x: float) -> float:
+    """Округление до ближайшего float32"""
+    return _float32.unpack(_float32.pack(x))[0]
+
+
+# в C таблица перестановок записана дважды, чтобы индексы не выходили за 255
+PERM = 2 * (
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225,
+    140, 36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148,
+    247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32,
+    57, 177, 33, 88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175,
+    74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122,
+    60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54,
+    65, 25, 63, 161, 1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169,
+    200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64,
+    52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212,
+    207, 206, 59, 227, 47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213,
+    119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9,
+    129, 22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104,
+    218, 246, 97, 228, 251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162, 241,
+    81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157,
+    184, 84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93,
+    222, 114, 67, 29, 24, 72, 243, 141, 128, 195, 78, 66, 215, 61, 156, 180,
+)
+GRAD3 = (
+    (1,1,0), (-1,1,0), (1,-1,0), (-1,-1,0),
+    (1,0,1), (-1,0,1), (1,0,-1), (-1,0,-1),
+    (0,1,1), (0,-1,1), (0,1,-1), (0,-1,-1),
+    (1,0,-1), (-1,0,-1), (0,-1,1), (0,1,1),
+)
+GRAD4 = (
+    (0,1,1,1), (0,1,1,-1), (0,1,-1,1), (0,1,-1,-1),
+    (0,-1,1,1), (0,-1,1,-1), (0,-1,-1,1), (0,-1,-1,-1),
+    (1,0,1,1), (1,0,1,-1), (1,0,-1,1), (1,0,-1,-1),
+    (-1,0,1,1), (-1,0,1,-1), (-1,0,-1,1), (-1,0,-1,-1),
+    (1,1,0,1), (1,1,0,-1), (1,-1,0,1), (1,-1,0,-1),
+    (-1,1,0,1), (-1,1,0,-1), (-1,-1,0,1), (-1,-1,0,-1),
+    (1,1,1,0), (1,1,-1,0), (1,-1,1,0), (1,-1,-1,0),
+    (-1,1,1,0), (-1,1,-1,0), (-1,-1,1,0), (-1,-1,-1,0),
+)
+SIMPLEX = (
+    (0,1,2,3), (0,1,3,2), (0,0,0,0), (0,2,3,1), (0,0,0,0), (0,0,0,0), (0,0,0,0), (1,2,3,0),
+    (0,2,1,3), (0,0,0,0), (0,3,1,2), (0,3,2,1), (0,0,0,0), (0,0,0,0), (0,0,0,0), (1,3,2,0),
+    (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0),
+    (1,2,0,3), (0,0,0,0), (1,3,0,2), (0,0,0,0), (0,0,0,0), (0,0,0,0), (2,3,0,1), (2,3,1,0),
+    (1,0,2,3), (1,0,3,2), (0,0,0,0), (0,0,0,0), (0,0,0,0), (2,0,3,1), (0,0,0,0), (2,1,3,0),
+    (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0), (0,0,0,0),
+    (2,0,1,3), (0,0,0,0), (0,0,0,0), (0,0,0,0), (3,0,1,2), (3,0,2,1), (0,0,0,0), (3,1,2,0),
+    (2,1,0,3), (0,0,0,0), (0,0,0,0), (0,0,0,0), (3,1,0,2), (0,0,0,0), (3,2,0,1), (3,2,1,0),
+)
+
+# 2D
+_F2 = f32(0.3660254037844386)   # 0.5 * (sqrt(3.0) - 1.0)
+_G2 = f32(0.21132486540518713)  # (3.0 - sqrt(3.0)) / 6.0
+# 4D
+_F4 = f32(0.30901699437494745)  # (sqrt(5.0) - 1.0) / 4.0
+_G4 = f32(0.1381966011250105)   # (5.0 - sqrt(5.0)) / 20.0
+_G4_MULTIPLES = (0.0, _G4, f32(2.0 * _G4), f32(3.0 * _G4), f32(4.0 * _G4))
+_0_6, _3_1, _3_6 = f32(0.6), f32(3.1), f32(3.6)
+
+
+def _noise2(x: float, y: float) -> float:
+    """noise2 из _simplex.c"""
+    s = f32(f32(x + y) * _F2)
+    i = floor(f32(x + s))
+    j = floor(f32(y + s))
+    t = f32(f32(i + j) * _G2)
+    x0 = f32(x - f32(i - t))
+    y0 = f32(y - f32(j - t))
+    i1, j1 = (1, 0) if x0 > y0 else (0, 1)
+
+    g2 = f32(_G2 * 2.0)
+    corners = (
+        (x0, y0),
+        (f32(f32(x0 - i1) + _G2), f32(f32(y0 - j1) + _G2)),
+        (f32(f32(x0 + g2) - 1.0), f32(f32(y0 + g2) - 1.0)),
+    )
+    I, J = int(i) & 255, int(j) & 255
+    gradients = (
+        PERM[I + PERM[J]] % 12,
+        PERM[I + i1 + PERM[J + j1]] % 12,
+        PERM[I + 1 + PERM[J + 1]] % 12,
+    )
+
+    total = 0.0
+    for (xc, yc), g in zip(corners, gradients):
+        f = f32(f32(0.5 - f32(xc * xc)) - f32(yc * yc))
+        if f > 0:
+            ff = f32(f * f)
+            dot = f32(f32(GRAD3[g][0] * xc) + f32(GRAD3[g][1] * yc))
+            total = f32(total + f32(f32(f32(ff * f) * f) * dot))
+    return f32(total * 70.0)
+
+
+def _noise4(x: float, y: float, z: float, w: float) -> float:
+    """noise4 из _simplex.c"""
+    s = f32(f32(f32(f32(x + y) + z) + w) * _F4)
+    i = floor(f32(x + s))
+    j = floor(f32(y + s))
+    k = floor(f32(z + s))
+    l = floor(f32(w + s))
+    t = f32(f32(f32(f32(i + j) + k) + l) * _G4)
+    x0 = f32(x - f32(i - t))
+    y0 = f32(y - f32(j - t))
+    z0 = f32(z - f32(k - t))
+    w0 = f32(w - f32(l - t))
+
+    c = ((x0 > y0) * 32 + (x0 > z0) * 16 + (y0 > z0) * 8
+         + (x0 > w0) * 4 + (y0 > w0) * 2 + (z0 > w0) * 1)
+    simplex = SIMPLEX[c]
+    I, J, K, L = int(i) & 255, int(j) & 255, int(k) & 255, int(l) & 255
+
+    total = 0.0
+    # вершины 0 и 4 - без сдвига и со сдвигом на 1 по всем осям, 1-3 - по таблице SIMPLEX
+    for vertex in range(5):
+        if vertex == 0:
+            oi = oj = ok = ol = 0
+        elif vertex == 4:
+            oi = oj = ok = ol = 1
+        else:
+            level = 4 - vertex
+            oi, oj, ok, ol = (int(axis >= level) for axis in simplex)
+        g = _G4_MULTIPLES[vertex]
+        if vertex:
+            xc, yc = f32(f32(x0 - oi) + g), f32(f32(y0 - oj) + g)
+            zc, wc = f32(f32(z0 - ok) + g), f32(f32(w0 - ol) + g)
+        else:
+            xc, yc, zc, wc = x0, y0, z0, w0
+
+        tc = f32(f32(f32(f32(_0_6 - f32(xc * xc)) - f32(yc * yc)) - f32(zc * zc)) - f32(wc * wc))
+        if tc >= 0:
+            gx, gy, gz, gw = GRAD4[PERM[I + oi + PERM[J + oj + PERM[K + ok + PERM[L + ol]]]] & 0x1f]
+            dot = f32(f32(f32(f32(gx * xc) + f32(gy * yc)) + f32(gz * zc)) + f32(gw * wc))
+            tc2 = f32(tc * tc)
+            total = f32(total + f32(f32(tc2 * tc2) * dot))
+    return f32(27.0 * total)
+
+
+def _fast_sin(x: float) -> float:
+    """fast_sin из _noise.h: аргумент в полупериодах (x = 2 - полный оборот)"""
+    z = f32(x + 25165824.0)
+    x = f32(x - f32(z - 25165824.0))
+    y = f32(x - f32(x * abs(x)))
+    return f32(y * f32(_3_1 + f32(_3_6 * abs(y))))
+
+
+
+def snoise2(x: float, y: float, octaves: int = 1, persistence: float = 0.5, lacunarity: float = 2.0,
+            repeatx: float | None = None, repeaty: float | None = None, base: float = 0.0) -> float:
+    """Аналог noise.snoise2 для одной точки, параметры те же, что у simplex.snoise2"""
+    if octaves <= 0:
+        raise ValueError("Expected octaves value > 0")
+    x, y, z = f32(x), f32(y), f32(base)
+    persistence, lacunarity = f32(persistence), f32(lacunarity)
+
+    if repeatx is None and repeaty is None:
+        # плоский шум: сдвиг base добавляется после умножения на частоту
+        freq, amp, max_amp = 1.0, 1.0, 1.0
+        total = _noise2(f32(x + z), f32(y + z))
+        for _ in range(1, octaves):
+            freq = f32(freq * lacunarity)
+            amp = f32(amp * persistence)
+            max_amp = f32(max_amp + amp)
+            total = f32(total + f32(_noise2(f32(f32(x * freq) + z), f32(f32(y * freq) + z)) * amp))
+        return f32(total / max_amp)
+    if repeatx is None or repeaty is None:
+        raise NotImplementedError("Повторение только по одной оси не поддерживается")
+
+    # бесшовный шум: каждая ось сворачивается в окружность, шум берется в 4D
+    yf = f32(y * 2.0 / repeaty)
+    yr = f32(repeaty * (1 / pi) * 0.5)
+    w = f32(z + f32(_fast_sin(f32(yf + 0.5)) * yr))
+    y = f32(_fast_sin(yf) * yr)
+    xf = f32(x * 2.0 / repeatx)
+    xr = f32(repeatx * (1 / pi) * 0.5)
+    z = f32(z + f32(_fast_sin(f32(xf + 0.5)) * xr))
+    x = f32(_fast_sin(xf) * xr)
+
+    freq, amp, max_amp = 1.0, 1.0, 1.0
+    total = _noise4(x, y, z, w)
+    for _ in range(1, octaves):
+        freq = f32(freq * lacunarity)
+        amp = f32(amp * persistence)
+        max_amp = f32(max_amp + amp)
+        total = f32(total + f32(_noise4(f32(x * freq), f32(y * freq), f32(z * freq), f32(w * freq)) * amp))
+    return f32(total / max_amp)
@@ -1,12 +1,34 @@
-import arcade
+import json
 
 import bodies
+import collision
 import const
 import laws
+import trail
+
+
+def check_dt(dt: float, source: str):
+    """ValueError, если source (пресеты, сценарий) получен с другим шагом физики, чем у Simulation"""
+    if abs(dt - 1 / const.physics_rate) > const.eps:
+        raise ValueError(f"{source} получен с шагом {dt:.6g} с, а физика идет с шагом 1/{const.physics_rate} с")
+
+
+def load_presets(path: str = const.presets_file) -> dict[str, tuple[float, float]]:
+    """Подобранные autotune.py параметры законов: имя закона -> (N, t_norm).
+
+    Параметры, подобранные с другим шагом физики, чем у Simulation, не подходят: ValueError
+    """
+    with open(path) as f:
+        presets = json.load(f)
+    for name, p in presets.items():
+        if "dt" in p:
+            check_dt(p["dt"], f"'{path}': {name}")
+    return {name: (p["N"], p["t_norm"]) for name, p in presets.items()}
 
 
 class Simulation:
-    def __init__(self):
+    def __init__(self, law=laws.PP, N=const.N, airplane_start=None, missile_start=None, record_trajectory=True,
+                 recorder=None, presets=None):
         self.running = False
         self.paused = False
         self.current_fps = const.FPS
@@ -18,64 +40,299 @@ class Simulation:
             5: laws.ZEMAPN,
             6: laws.myZEM,
         }
-        self.current_law = laws.PP
+        self.current_law = law
+        self.N = N
+        self.airplane_start = airplane_start or const.airplane_start
+        self.missile_start = missile_start or const.missile_start
+        self.record_trajectory = record_trajectory
+        self.physics_dt = 1 / const.physics_rate
+        self.trajectory_aircraft = trail.Trail()
+        self.trajectory_missile = trail.Trail()
+        self.recorder = recorder    # recorder.Recorder, пишет каждый шаг физики
+        self.presets = presets or {}    # имя закона -> (N, t_norm), см. load_presets
+        self.script = None  # сценарий script(t, sim) -> (turn, throttle) вместо клавиатуры, например headless.Timeline
         self.reset()
 
     def reset(self):
-        self.airplane = bodies.Airplane(*const.airplane_start)
+        self.airplane = bodies.Airplane(*self.airplane_start)
+        N, t_norm = self.gains(self.current_law)
         self.missile = bodies.Missile(
-            *const.missile_start, target=self.airplane, law=self.current_law, N=const.N
+            *self.missile_start, target=self.airplane, law=self.current_law, N=N, t_norm=t_norm
         )
-        self.trajectory_aircraft = []
-        self.trajectory_missile = []
+        self.trajectory_aircraft.clear()
+        self.trajectory_missile.clear()
         self.game_over = False
         self.win = False
         self.running = False
+        self.time = 0.0
+        self.event_time = None
+        self.last_record = -1.0
+        self.miss_distance = self.distance()
+        self.accumulator = 0.0
+        self.previous = self.snapshot()
+        if self.recorder is not None:
+            self.recorder.record(self)
 
-    def handle_input(self, keys):
-        if arcade.key.A in keys and arcade.key.D in keys:
-            self.airplane.an = 0.0
-        elif arcade.key.A in keys:
-            self.airplane.an = const.acceleration_n * abs(
-                self.airplane.current_speed / const.airplane_max_speed
-            )
-        elif arcade.key.D in keys:
-            self.airplane.an = -const.acceleration_n * abs(
-                self.airplane.current_speed / const.airplane_max_speed
-            )
-        else:
-            self.airplane.an = 0.0
-
-        if arcade.key.W in keys and arcade.key.S in keys:
-            self.airplane.at = 0.0
-        elif arcade.key.W in keys:
-            self.airplane.at = const.acceleration_t / 2
-        elif arcade.key.S in keys:
-            self.airplane.at = -const.acceleration_t
+    def gains(self, law) -> tuple[float, float]:
+        """N и t_norm закона: из presets, если закон там есть, иначе общие N и laws.t_norm"""
+        return self.presets.get(law.__name__, (self.N, laws.t_norm))
+
+    def distance(self) -> float:
+        """Текущее расстояние между ракетой и самолетом"""
+        return const.hypotenuse(self.missile.x - self.airplane.x, self.missile.y - self.airplane.y)
+
+    def control(self, turn: float, throttle: float):
+        """Управление самолетом в долях от предельных ускорений.
+
+        Args:
+            turn (float): от -1 до 1, + налево, - направо (клавиши A / D дают 1 / -1)
+            throttle (float): от -1 до 1, + разгон, - торможение (клавиши W / S дают 1 / -1)
+        """
+        self.airplane.an = turn * const.acceleration_n * abs(
+            self.airplane.current_speed / const.airplane_max_speed
+        )
+        if throttle > 0:
+            self.airplane.at = throttle * const.acceleration_t / 2
         else:
-            self.airplane.at = 0.0
+            self.airplane.at = throttle * const.acceleration_t
+
+    def snapshot(self) -> list[tuple[float, float, float, float]]:
+        """Положения и скорости тел (самолет, ракета) для интерполяции при отрисовке"""
+        return [(b.x, b.y, b.vx, b.vy) for b in (self.airplane, self.missile)]
+
+    def advance(self, frame_dt: float) -> int:
+        """Продвигает физику на время кадра шагами фиксированной длины physics_dt.
+
+        Остаток времени копится до следующего кадра, поэтому результат не зависит от частоты кадров.
+        После подвисания делается не больше const.max_substeps шагов, лишнее время отбрасывается.
+
+        Args:
+            frame_dt (float): время кадра
+
+        Returns:
+            int: число сделанных шагов физики
+        """
+        if not self.running or self.paused or self.game_over:
+            self.accumulator = 0.0
+            self.previous = self.snapshot()
+            return 0
+        self.accumulator += frame_dt
+        steps = 0
+        while self.accumulator >= self.physics_dt and steps < const.max_substeps:
+            self.previous = self.snapshot()
+            if self.script is not None:
+                # сценарий применяется на каждом шаге физики, как в headless.run с тем же dt
+                self.control(*self.script(self.time, self))
+            self.update(self.physics_dt)
+            self.accumulator -= self.physics_dt
+            steps += 1
+        if steps == const.max_substeps:
+            self.accumulator = min(self.accumulator, self.physics_dt)
+        return steps
+
+    def interpolated(self, i: int) -> tuple[float, float, float, float]:
+        """Положение и скорость тела i (0 - самолет, 1 - ракета) между двумя последними шагами физики,
+        чтобы движение на экране было плавным при любой частоте кадров"""
+        if self.game_over:
+            return self.snapshot()[i]
+        alpha = self.accumulator / self.physics_dt
+        return tuple(p + (c - p) * alpha for p, c in zip(self.previous[i], self.snapshot()[i]))
+
     def update(self, dt):
         if not self.running or self.paused or self.game_over:
             return
-        self.airplane.calc_move(dt)
-        self.missile.calc_move(dt)
+        airplane, missile = self.airplane, self.missile
+        # относительное движение ракеты и движение самолета относительно зоны победы в начале шага
+        rx, ry = missile.x - airplane.x, missile.y - airplane.y
+        rvx, rvy = missile.vx - airplane.vx, missile.vy - airplane.vy
+        px, py, pvx, pvy = airplane.x, airplane.y, airplane.vx, airplane.vy
+        distance_start = self.distance()
+        win_distance_start = const.hypotenuse(px, py)
+
+        airplane.calc_move(dt)
+        missile.calc_move(dt)
+
+        # столкновение ищется по всему шагу, а не только в его конце
+        hit_time = self.sweep(
+            (rx, ry, rvx, rvy, missile.ax - airplane.ax, missile.ay - airplane.ay),
+            distance_start, self.distance(), const.plane_size, dt, track_miss=True,
+        )
+        win_time = self.sweep(
+            (px, py, pvx, pvy, airplane.ax, airplane.ay),
+            win_distance_start, const.hypotenuse(airplane.x, airplane.y), const.win_zone_r, dt,
+        )
+        if hit_time is not None and (win_time is None or hit_time <= win_time):
+            self.game_over = True
+            self.event_time = self.time + hit_time
+        elif win_time is not None:
+            self.win = True
+            self.game_over = True
+            self.event_time = self.time + win_time
+        self.time += dt
+        if self.recorder is not None:
+            self.recorder.record(self)
+
+        # траектории пишутся с частотой отрисовки, а не физики
+        if self.record_trajectory and self.time - self.last_record >= 1 / const.FPS - const.eps:
+            self.last_record = self.time
+            self.record()
+
+    def sweep(self, motion, d_start, d_end, radius, dt, track_miss=False) -> float | None:
+        """Проверяет сближение на расстояние radius за шаг.
+
+        Args:
+            motion: относительное движение x0, y0, vx, vy, ax, ay за шаг
+            d_start (float): расстояние в начале шага
+            d_end (float): расстояние в конце шага
+            radius (float): порог сближения
+            dt (float): длина шага
+            track_miss (bool): обновлять ли miss_distance точным минимальным расстоянием
+
+        Returns:
+            float | None: время от начала шага, когда расстояние стало меньше radius, или None
+        """
+        t, d = self.approach(motion, d_start, d_end, dt)
+        if track_miss:
+            self.miss_distance = min(self.miss_distance, float(d))
+        if d >= radius:
+            return None
+        return float(collision.entry_time(*motion, t, radius))
+
+    @staticmethod
+    def approach(motion, d_start, d_end, dt) -> tuple[float, float]:
+        """Момент и расстояние наибольшего сближения за шаг. Если расстояние за весь шаг
+        только убывает или только растет, обходится без решения уравнения"""
+        rate_start, rate_end = collision.range_rates(*motion, dt)
+        if rate_start < 0 and rate_end < 0:
+            return dt, d_end
+        if rate_start >= 0 and rate_end >= 0:
+            return 0.0, d_start
+        t, d = collision.closest_approach(*motion, dt)
+        return t, float(d)
+
+    def record(self):
+        """Добавляет текущие положения в траектории"""
         self.trajectory_aircraft.append(
-            (
-                self.airplane.x - self.airplane.vx * (const.move_trajectory / self.airplane.current_speed),
-                self.airplane.y - self.airplane.vy * (const.move_trajectory / self.airplane.current_speed),
+            self.airplane.x - self.airplane.vx * (const.move_trajectory / self.airplane.current_speed),
+            self.airplane.y - self.airplane.vy * (const.move_trajectory / self.airplane.current_speed),
+        )
+        self.trajectory_missile.append(self.missile.x, self.missile.y)
+
+
+class ComparisonSimulation(Simulation):
+    """Все законы из Simulation.laws сразу: по ракете на закон против одного самолета.
+
+    Самолет, его шаг и проверка зоны победы общие, каждая ракета считает только свой закон
+    и свое сближение, поэтому шаг дешевле шести отдельных симуляций, а итог каждой ракеты
+    тот же, что у Simulation с ее законом и тем же управлением самолетом.
+    Ракета, долетевшая до самолета, взрывается и останавливается, остальные летят дальше.
+    Перехват заканчивается, когда взорвались все ракеты или самолет долетел до зоны победы.
+
+    Args:
+        N: навигационная постоянная всех ракет
+        airplane_start: начальные условия самолета, по умолчанию const.airplane_start
+        missile_start: начальные условия ракет, по умолчанию const.missile_start
+        record_trajectory (bool): писать траектории для отрисовки
+        presets: имя закона -> (N, t_norm), см. load_presets
+    """
+    def __init__(self, N=const.N, airplane_start=None, missile_start=None, record_trajectory=True, presets=None):
+        self.trajectory_missiles = [trail.Trail() for _ in range(6)]
+        super().__init__(laws.PP, N, airplane_start, missile_start, record_trajectory, presets=presets)
+        self.current_law = None
+
+    def reset(self):
+        self.airplane = bodies.Airplane(*self.airplane_start)
+        self.missiles = []
+        for law in self.laws.values():
+            N, t_norm = self.gains(law)
+            self.missiles.append(
+                bodies.Missile(*self.missile_start, target=self.airplane, law=law, N=N, t_norm=t_norm)
             )
+        self.exploded = [False] * len(self.missiles)
+        self.hit_time = [None] * len(self.missiles)
+        self.miss_distances = [self.distance(m) for m in self.missiles]
+        self.trajectory_aircraft.clear()
+        for t in self.trajectory_missiles:
+            t.clear()
+        self.game_over = False
+        self.win = False
+        self.running = False
+        self.time = 0.0
+        self.event_time = None
+        self.last_record = -1.0
+        self.accumulator = 0.0
+        self.previous = self.snapshot()
+
+    @property
+    def missile(self) -> bodies.Missile:
+        """Ближайшая к самолету невзорвавшаяся ракета (для HUD), если таких нет - первая"""
+        flying = [m for m, exploded in zip(self.missiles, self.exploded) if not exploded]
+        return min(flying, key=self.distance) if flying else self.missiles[0]
+
+    @property
+    def miss_distance(self) -> float:
+        return min(self.miss_distances)
+
+    def distance(self, missile=None) -> float:
+        """Расстояние от ракеты (по умолчанию ближайшей) до самолета"""
+        missile = missile or self.missile
+        return const.hypotenuse(missile.x - self.airplane.x, missile.y - self.airplane.y)
+
+    def snapshot(self) -> list[tuple[float, float, float, float]]:
+        """Положения и скорости тел: самолет, затем ракеты в порядке Simulation.laws"""
+        return [(b.x, b.y, b.vx, b.vy) for b in (self.airplane, *self.missiles)]
+
+    def update(self, dt):
+        if not self.running or self.paused or self.game_over:
+            return
+        airplane = self.airplane
+        flying = [i for i, exploded in enumerate(self.exploded) if not exploded]
+        starts = {}
+        for i in flying:
+            missile = self.missiles[i]
+            starts[i] = (missile.x - airplane.x, missile.y - airplane.y,
+                         missile.vx - airplane.vx, missile.vy - airplane.vy, self.distance(missile))
+        px, py, pvx, pvy = airplane.x, airplane.y, airplane.vx, airplane.vy
+        win_distance_start = const.hypotenuse(px, py)
+
+        airplane.calc_move(dt)
+        win_time = self.sweep(
+            (px, py, pvx, pvy, airplane.ax, airplane.ay),
+            win_distance_start, const.hypotenuse(airplane.x, airplane.y), const.win_zone_r, dt,
         )
-        self.trajectory_missile.append((self.missile.x, self.missile.y))
-        if len(self.trajectory_aircraft) > 600:
-            self.trajectory_aircraft.pop(0)
-            self.trajectory_missile.pop(0)
-
-        if (
-            const.hypotenuse(self.missile.x - self.airplane.x, self.missile.y - self.airplane.y)
-            < const.plane_size
-        ):
-            self.game_over = True
 
-        if const.hypotenuse(self.airplane.x, self.airplane.y) < const.win_zone_r:
+        for i in flying:
+            missile = self.missiles[i]
+            missile.calc_move(dt)
+            rx, ry, rvx, rvy, distance_start = starts[i]
+            motion = (rx, ry, rvx, rvy, missile.ax - airplane.ax, missile.ay - airplane.ay)
+            t, d = self.approach(motion, distance_start, self.distance(missile), dt)
+            self.miss_distances[i] = min(self.miss_distances[i], d)
+            if d < const.plane_size:
+                hit_time = float(collision.entry_time(*motion, t, const.plane_size))
+                if win_time is None or hit_time <= win_time:
+                    self.exploded[i] = True
+                    self.hit_time[i] = self.time + hit_time
+
+        if win_time is not None:
             self.win = True
             self.game_over = True
+            self.event_time = self.time + win_time
+        elif all(self.exploded):
+            self.game_over = True
+            self.event_time = max(self.hit_time)
+        self.time += dt
+
+        if self.record_trajectory and self.time - self.last_record >= 1 / const.FPS - const.eps:
+            self.last_record = self.time
+            self.record()
+
+    def record(self):
+        """Добавляет текущие положения в траектории, у взорвавшихся ракет траектория не растет"""
+        self.trajectory_aircraft.append(
+            self.airplane.x - self.airplane.vx * (const.move_trajectory / self.airplane.current_speed),
+            self.airplane.y - self.airplane.vy * (const.move_trajectory / self.airplane.current_speed),
+        )
+        for missile, exploded, trajectory in zip(self.missiles, self.exploded, self.trajectory_missiles):
+            if not exploded:
+                trajectory.append(missile.x, missile.y)
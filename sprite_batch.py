@@ -0,0 +1,53 @@
+import math
+
+import arcade
+
+
+def heading(vx: float, vy: float) -> float:
+    """Угол спрайта в arcade (по часовой от оси y) для вектора скорости"""
+    return 90 - math.degrees(math.atan2(vy, vx))
+
+
+class BodySprites:
+    """Все самолеты, ракеты и взрывы в одном постоянном SpriteList.
+
+    Спрайты создаются один раз, дальше у них меняются только положение, угол и видимость,
+    поэтому SpriteList обновляет эти значения в своих буферах на месте, а не перестраивает
+    их, и все тела рисуются одним вызовом. У каждой ракеты есть свой спрайт взрыва,
+    ракета и взрыв переключаются видимостью.
+
+    Args:
+        aircraft (arcade.Texture): текстура самолета
+        missile (arcade.Texture): текстура ракеты
+        boom (arcade.Texture): текстура взрыва
+        airplanes (int): число самолетов
+        missiles (int): число ракет
+    """
+    def __init__(self, aircraft: arcade.Texture, missile: arcade.Texture, boom: arcade.Texture,
+                 airplanes: int = 1, missiles: int = 1):
+        textures = (aircraft, missile, boom)
+        self.sprites = arcade.SpriteList(capacity=airplanes + 2 * missiles)
+        self.airplanes = [arcade.Sprite(textures[0], 0.01) for _ in range(airplanes)]
+        self.missiles = [arcade.Sprite(textures[1], 0.004) for _ in range(missiles)]
+        self.booms = [arcade.Sprite(textures[2], 0.012) for _ in range(missiles)]
+        for boom_sprite in self.booms:
+            boom_sprite.visible = False
+        # взрывы поверх самолетов и ракет
+        self.sprites.extend(self.airplanes + self.missiles + self.booms)
+
+    def update_airplane(self, i: int, x: float, y: float, vx: float, vy: float):
+        sprite = self.airplanes[i]
+        sprite.position = (x, y)
+        sprite.angle = heading(vx, vy)
+
+    def update_missile(self, i: int, x: float, y: float, vx: float, vy: float, exploded: bool = False):
+        """Ракета i, после попадания (exploded) вместо нее виден взрыв"""
+        missile, boom_sprite = self.missiles[i], self.booms[i]
+        missile.visible = not exploded
+        boom_sprite.visible = exploded
+        sprite = boom_sprite if exploded else missile
+        sprite.position = (x, y)
+        sprite.angle = heading(vx, vy)
+
+    def draw(self):
+        self.sprites.draw()
@@ -0,0 +1,84 @@
+"""Кэш сгенерированных слоев карты (высоты, вариация цвета) по хэшу параметров генерации.
+
+Каждый слой лежит отдельным файлом {слой}_{хэш}.npy и открывается как np.memmap, поэтому
+смена цвета или порога биома только перекрашивает карту по готовым высотам, а смена,
+например, масштаба цветового шума пересчитывает один слой вариации.
+Когда кэш превышает заданный размер, удаляются давно не использованные слои.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from parallel_generation import SharedGrid
+
+# Меняется, когда меняется сам алгоритм генерации слоя (старые файлы перестают подходить)
+VERSION = 1
+
+
+def layer_key(kind: str, params: dict) -> str:
+    """Хэш слоя: имя слоя, версия алгоритма и все параметры генерации"""
+    text = json.dumps({"kind": kind, "version": VERSION, **params}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:24]
+
+
+class TerrainCache:
+    """Папка с готовыми слоями карты.
+
+    Args:
+        path (str): папка кэша
+        max_bytes (int): предельный размер кэша, сверх него удаляются самые старые по использованию слои
+    """
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def file(self, kind: str, params: dict) -> str:
+        return os.path.join(self.path, f"{kind}_{layer_key(kind, params)}.npy")
+
+    def layer(self, kind: str, params: dict, shape: tuple[int, int], build) -> np.ndarray:
+        """Слой из кэша, при промахе строится и сохраняется.
+
+        Args:
+            kind (str): имя слоя, например "height"
+            params (dict): все параметры, от которых зависит слой (значения - числа или строки)
+            shape (tuple[int, int]): форма слоя
+            build: функция build(grid), заполняющая parallel_generation.SharedGrid
+
+        Returns:
+            np.ndarray: слой только для чтения (np.memmap)
+        """
+        path = self.file(kind, params)
+        if not os.path.exists(path):
+            # пишем во временный файл, чтобы прерванная генерация не оставила битый слой
+            partial = path[:-len(".npy")] + ".partial.npy"
+            grid = SharedGrid(shape, partial)
+            try:
+                build(grid)
+            finally:
+                grid.close()
+            os.replace(partial, path)
+            self.evict(keep=path)
+        else:
+            os.utime(path)  # время изменения файла служит временем последнего использования
+        return np.load(path, mmap_mode="r")
+
+    def evict(self, keep: str | None = None):
+        """Удаляет самые давние слои, пока кэш больше max_bytes"""
+        files = []
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if name.endswith(".npy") and not name.endswith(".partial.npy") and path != keep:
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if keep is not None:
+            total += os.path.getsize(keep)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -0,0 +1,56 @@
+import numpy as np
+
+import const
+
+
+class Trail:
+    """Траектория тела в кольцевом буфере фиксированной длины.
+
+    Каждая точка пишется в буфер дважды (в позиции i и i + length), поэтому последние
+    length точек всегда лежат в буфере подряд и points() возвращает срез без копирования.
+    Добавление точки - O(1) и без выделения памяти.
+
+    Args:
+        length (int): число хранимых точек
+        decimation (int): сохранять каждую decimation-ю точку (для очень длинных траекторий)
+    """
+    def __init__(self, length: int = const.trajectory_length, decimation: int = const.trajectory_decimation):
+        self.length = length
+        self.decimation = max(1, decimation)
+        self._buffer = np.zeros((2 * length, 2), dtype=np.float32)
+        self.clear()
+
+    def clear(self):
+        self.head = 0       # куда будет записана следующая точка
+        self.count = 0      # сколько точек сейчас хранится
+        self.total = 0      # сколько точек было записано всего (с учетом прореживания)
+        self._skipped = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, x: float, y: float):
+        """Добавляет точку, старейшая точка вытесняется при заполнении буфера"""
+        skip = self._skipped
+        self._skipped = (skip + 1) % self.decimation
+        if skip:
+            return
+        buffer = self._buffer
+        buffer[self.head] = buffer[self.head + self.length] = (x, y)
+        self.head = (self.head + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+        self.total += 1
+
+    @property
+    def buffer(self) -> np.ndarray:
+        """Весь двойной буфер (2 * length, 2) - для зеркалирования на видеокарту"""
+        return self._buffer
+
+    @property
+    def start(self) -> int:
+        """Позиция старейшей точки в буфере"""
+        return self.head if self.count == self.length else 0
+
+    def points(self) -> np.ndarray:
+        """Точки от старой к новой, непрерывный массив (count, 2) float32 - срез буфера без копирования"""
+        return self._buffer[self.start:self.start + self.count]
@@ -0,0 +1,106 @@
+import arcade
+from arcade.gl import BufferDescription
+
+from trail import Trail
+
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform int u_last;
+uniform float u_length;
+
+in vec2 in_pos;
+out float v_alpha;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_pos, 0.0, 1.0);
+    // чем старее точка, тем прозрачнее
+    v_alpha = 1.0 - float(u_last - gl_VertexID) / u_length;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+uniform vec4 u_color;
+
+in float v_alpha;
+out vec4 fragColor;
+
+void main() {
+    fragColor = vec4(u_color.rgb, u_color.a * v_alpha);
+}
+"""
+
+
+class TrailRenderer:
+    """Рисует траектории trail.Trail из постоянного буфера на видеокарте.
+
+    Буфер повторяет двойную раскладку Trail, поэтому каждый кадр на видеокарту
+    отправляются только новые точки, а каждая траектория рисуется одним вызовом
+    по непрерывному диапазону вершин. Старые участки затухают в шейдере.
+
+    Args:
+        ctx: контекст arcade (window.ctx)
+        trails (list[Trail]): траектории, все одной длины
+        colors: цвета траекторий (arcade.color или RGBA)
+        fade (bool): затухание старых участков
+    """
+    def __init__(self, ctx, trails: list[Trail], colors, fade: bool = True):
+        self.ctx = ctx
+        self.fade = fade
+        self.program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+        self.set_trails(trails, colors)
+
+    def set_trails(self, trails: list[Trail], colors):
+        """Подключает новые траектории (например, после сброса симуляции)"""
+        self.trails = list(trails)
+        self.colors = [tuple(c / 255 for c in arcade.types.Color.from_iterable(color)) for color in colors]
+        self.uploaded = [-1] * len(self.trails)    # Trail.total на момент последней отправки
+        self.rows = [2 * t.length for t in self.trails]
+        self.offsets = [sum(self.rows[:i]) for i in range(len(self.trails))]
+        size = max(1, sum(self.rows)) * 2 * 4
+        self.buffer = self.ctx.buffer(reserve=size)
+        self.geometry = self.ctx.geometry(
+            [BufferDescription(self.buffer, "2f", ["in_pos"])], mode=self.ctx.LINE_STRIP
+        )
+
+    def invalidate(self):
+        """Отправить траектории целиком при следующей синхронизации (после их перестройки)"""
+        self.uploaded = [-1] * len(self.trails)
+
+    def sync(self):
+        """Отправляет на видеокарту точки, добавленные с прошлого кадра"""
+        for i, trail in enumerate(self.trails):
+            new = trail.total - self.uploaded[i]
+            if new == 0:
+                continue
+            base = self.offsets[i]
+            if self.uploaded[i] < 0 or new < 0 or new >= trail.length:
+                # первая отправка, сброс или слишком много новых точек - отправляем буфер целиком
+                self.buffer.write(trail.buffer.tobytes(), offset=base * 8)
+            else:
+                for k in range(new):
+                    slot = (trail.head - 1 - k) % trail.length
+                    row = trail.buffer[slot].tobytes()
+                    self.buffer.write(row, offset=(base + slot) * 8)
+                    self.buffer.write(row, offset=(base + slot + trail.length) * 8)
+            self.uploaded[i] = trail.total
+
+    def draw(self):
+        """Рисует все траектории, по одному вызову на траекторию"""
+        self.sync()
+        self.ctx.enable(self.ctx.BLEND)
+        for i, trail in enumerate(self.trails):
+            if trail.count < 2:
+                continue
+            first = self.offsets[i] + trail.start
+            self.program["u_color"] = self.colors[i]
+            self.program["u_last"] = first + trail.count - 1
+            self.program["u_length"] = float(trail.count if self.fade else 1e30)
+            self.geometry.render(self.program, mode=self.ctx.LINE_STRIP, first=first, vertices=trail.count)